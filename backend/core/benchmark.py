@@ -0,0 +1,235 @@
+import json
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+
+from recipes.loaders import (INGREDIENT_FIELDS, TAG_FIELDS, load_ingredients,
+                             load_tags, read_rows)
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Subscribe
+
+User = get_user_model()
+
+# (минимум, максимум) связей на один объект.
+FAN_OUT = {
+    'tags': (1, 3),
+    'ingredients': (3, 15),
+    'favorites': (5, 40),
+    'carts': (1, 10),
+    'subscriptions': (1, 20),
+}
+
+
+# Кэш в памяти процесса вместо общего: замер не должен ни читать
+# рабочие списки покупок и каталоги, ни сбрасывать их версии.
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    }
+}
+
+
+@contextmanager
+def test_database(keepdb=False):
+    """Создает отдельную тестовую базу и кэш на время замера, чтобы
+    синтетические данные не попали в рабочие."""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=keepdb
+    )
+    try:
+        with override_settings(CACHES=BENCHMARK_CACHES):
+            yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb
+        )
+
+
+def is_seeded():
+    return User.objects.filter(username__startswith='bench').exists()
+
+
+def sample(rng, population, fan_out):
+    low, high = FAN_OUT[fan_out]
+    return rng.sample(population, min(rng.randint(low, high), len(population)))
+
+
+def seed(users_count, recipes_count, seed_value):
+    """Заполняет базу синтетическими данными. При одинаковых параметрах
+    данные совпадают от запуска к запуску."""
+    rng = random.Random(seed_value)
+    data_dir = settings.BASE_DIR / 'db_data'
+    load_tags(read_rows(data_dir / 'tags.csv', TAG_FIELDS))
+    load_ingredients(
+        read_rows(data_dir / 'ingredients.csv', INGREDIENT_FIELDS), 10000
+    )
+    User.objects.bulk_create(
+        User(
+            email=f'bench{i}@example.com',
+            username=f'bench{i}',
+            first_name='Бенчмарк',
+            last_name=str(i),
+            password='!'
+        )
+        for i in range(users_count)
+    )
+    users = list(User.objects.filter(username__startswith='bench'))
+    Token.objects.bulk_create(
+        Token(user=user, key=Token.generate_key()) for user in users
+    )
+    tag_ids = list(Tag.objects.values_list('id', flat=True))
+    ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+    Recipe.objects.bulk_create(
+        Recipe(
+            author=rng.choice(users),
+            name=f'Рецепт {i}',
+            text='Синтетический рецепт для замеров. ' * rng.randint(1, 20),
+            cooking_time=rng.randint(5, 180),
+            image='recipes/images/benchmark.png'
+        )
+        for i in range(recipes_count)
+    )
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+        for recipe_id in recipe_ids
+        for tag_id in sample(rng, tag_ids, 'tags')
+    )
+    RecipeIngredient.objects.bulk_create(
+        (RecipeIngredient(
+            recipe_id=recipe_id,
+            ingredient_id=ingredient_id,
+            amount=rng.randint(1, 1000)
+        )
+            for recipe_id in recipe_ids
+            for ingredient_id in sample(rng, ingredient_ids, 'ingredients')),
+        batch_size=5000
+    )
+    for model, fan_out in ((Favorite, 'favorites'), (ShoppingCart, 'carts')):
+        model.objects.bulk_create(
+            (model(user=user, recipe_id=recipe_id)
+             for user in users
+             for recipe_id in sample(rng, recipe_ids, fan_out)),
+            batch_size=5000
+        )
+    Subscribe.objects.bulk_create(
+        Subscribe(user=user, author=author)
+        for user in users
+        for author in sample(rng, users, 'subscriptions')
+        if author != user
+    )
+    Recipe.objects.reconcile_counters()
+
+
+def scenarios(rng):
+    """Горячие пути API: имя -> функция, возвращающая
+    (пользователь, url, параметры запроса)."""
+    users = list(User.objects.filter(username__startswith='bench'))
+    cart_users = list(User.objects.filter(
+        shopping_cart_recipes__isnull=False
+    ).distinct())
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    pages = max(len(recipe_ids) // 6, 1)
+    prefixes = [
+        name[:rng.randint(2, 4)]
+        for name in Ingredient.objects.values_list('name', flat=True)
+    ]
+    return {
+        'recipe_list': lambda: (
+            rng.choice(users), '/api/recipes/',
+            {'limit': 6, 'page': rng.randint(1, pages)}
+        ),
+        'recipe_detail': lambda: (
+            rng.choice(users), f'/api/recipes/{rng.choice(recipe_ids)}/', {}
+        ),
+        'ingredient_search': lambda: (
+            None, '/api/ingredients/', {'name': rng.choice(prefixes)}
+        ),
+        'shopping_cart_download': lambda: (
+            rng.choice(cart_users), '/api/recipes/download_shopping_cart/',
+            {}
+        ),
+        'subscriptions': lambda: (
+            rng.choice(users), '/api/users/subscriptions/',
+            {'limit': 6, 'recipes_limit': 3}
+        ),
+    }
+
+
+def percentile(values, percent):
+    return statistics.quantiles(values, n=100)[percent - 1]
+
+
+def measure(make_request, requests_count, warmup):
+    client = Client()
+    tokens = dict(Token.objects.values_list('user_id', 'key'))
+    timings, queries = [], []
+    for step in range(warmup + requests_count):
+        user, url, params = make_request()
+        headers = {}
+        if user is not None:
+            headers['HTTP_AUTHORIZATION'] = f'Token {tokens[user.id]}'
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = client.get(url, params, **headers)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise RuntimeError(f'{url}: ответ {response.status_code}')
+        if step >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(len(context))
+    return {
+        'requests': requests_count,
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'queries_mean': round(statistics.mean(queries), 2),
+        'queries_max': max(queries),
+    }
+
+
+def run(requests_count, warmup, seed_value, only=None):
+    rng = random.Random(seed_value)
+    return {
+        name: measure(make_request, requests_count, warmup)
+        for name, make_request in scenarios(rng).items()
+        if not only or name in only
+    }
+
+
+def compare(results, baseline, threshold):
+    """Сравнивает результаты с базовыми. Возвращает список регрессий:
+    p95 вырос больше чем в threshold раз или выросло число запросов."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * threshold:
+            regressions.append(
+                f'{name}: p95 {base["p95_ms"]} -> {result["p95_ms"]} мс'
+            )
+        if result['queries_max'] > base['queries_max']:
+            regressions.append(
+                f'{name}: запросов {base["queries_max"]} -> '
+                f'{result["queries_max"]}'
+            )
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)['results']
@@ -0,0 +1,74 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import (compare, is_seeded, load_baseline, run, seed,
+                            test_database)
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку и число запросов горячих эндпоинтов API '
+            'на синтетических данных в отдельной тестовой базе')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Число замеряемых запросов на сценарий')
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--only', nargs='*',
+                            help='Запустить только указанные сценарии')
+        parser.add_argument('--output',
+                            help='Сохранить результаты в JSON-файл')
+        parser.add_argument('--baseline',
+                            help='JSON-файл с результатами для сравнения')
+        parser.add_argument('--threshold', type=float, default=1.2,
+                            help='Допустимый рост p95 относительно базы')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Не удалять тестовую базу после замера '
+                                 'и не заполнять ее повторно')
+
+    def handle(self, *args, **options):
+        # Перцентили считаются statistics.quantiles, которому нужно
+        # хотя бы два замера; проверяем до заполнения базы.
+        if options['requests'] < 2:
+            raise CommandError('--requests должно быть не меньше 2')
+        with test_database(keepdb=options['keepdb']):
+            # С --keepdb база могла остаться от прошлого запуска.
+            if is_seeded():
+                self.stdout.write('Данные уже есть в тестовой базе, '
+                                  'заполнение пропущено')
+            else:
+                seed(options['users'], options['recipes'], options['seed'])
+            results = run(
+                options['requests'], options['warmup'], options['seed'],
+                options['only']
+            )
+        self.stdout.write(
+            f'{"сценарий":<24}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"запросов":>10}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<24}{result["p50_ms"]:>9}{result["p95_ms"]:>9}'
+                f'{result["p99_ms"]:>9}{result["queries_max"]:>10}'
+            )
+        if options['output']:
+            params = {
+                key: options[key]
+                for key in ('users', 'recipes', 'requests', 'warmup', 'seed')
+            }
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({'params': params, 'results': results}, file,
+                          ensure_ascii=False, indent=2)
+        if options['baseline']:
+            regressions = compare(
+                results, load_baseline(options['baseline']),
+                options['threshold']
+            )
+            if regressions:
+                raise CommandError(
+                    'Регрессии относительно базы:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
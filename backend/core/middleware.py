@@ -0,0 +1,109 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('foodgram.queries')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryRecorder:
+    """Обертка для connection.execute_wrapper, замеряющая каждый запрос."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            self.queries.append((duration, sql))
+
+    def slowest(self, limit):
+        return sorted(self.queries, reverse=True)[:limit]
+
+
+def get_query_budget(view_func, method):
+    """Бюджет запросов из атрибута query_budgets класса представления:
+    словарь {действие: число запросов}."""
+    view_class = getattr(view_func, 'cls', None)
+    budgets = getattr(view_class, 'query_budgets', None)
+    if not budgets:
+        return None
+    actions = getattr(view_func, 'actions', None) or {}
+    return budgets.get(actions.get(method.lower()))
+
+
+class QueryProfilingMiddleware:
+    """Считает SQL-запросы и время работы с базой для каждого запроса.
+
+    Включается настройкой QUERY_PROFILING. Результат отдается в заголовке
+    Server-Timing и пишется в лог foodgram.queries одной JSON-строкой.
+    Если представление превысило свой query_budgets, в лог пишется
+    предупреждение, а при QUERY_BUDGET_STRICT выбрасывается исключение,
+    чтобы тесты падали.
+
+    Запросы, выполненные при чтении StreamingHttpResponse, не
+    учитываются: тело отдается уже после выхода из middleware.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+        response['Server-Timing'] = (
+            f'db;dur={recorder.duration * 1000:.1f};'
+            f'desc="{recorder.count} queries", '
+            f'app;dur={total * 1000:.1f}'
+        )
+        budget = getattr(request, 'query_budget', None)
+        over_budget = budget is not None and recorder.count > budget
+        logger.log(
+            logging.WARNING if over_budget else logging.INFO,
+            json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': recorder.count,
+                'budget': budget,
+                'db_ms': round(recorder.duration * 1000, 1),
+                'total_ms': round(total * 1000, 1),
+                'slowest': [
+                    {'ms': round(duration * 1000, 1), 'sql': sql}
+                    for duration, sql in recorder.slowest(
+                        settings.QUERY_PROFILING_SLOWEST
+                    )
+                ],
+            }, ensure_ascii=False)
+        )
+        if over_budget and settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(
+                f'{request.method} {request.path}: {recorder.count} '
+                f'запросов при бюджете {budget}'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request.method)
@@ -1,5 +1,47 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset-пагинация по id: страница выбирается условием id < курсор,
+    поэтому глубокие страницы не медленнее первой."""
+
+    ordering = '-id'
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Курсор задает свой порядок и молча отбросил бы другую
+        # сортировку (например, ?ordering=popular или поиск).
+        if queryset.query.order_by not in ((), (self.ordering,)):
+            raise ValidationError({self.cursor_query_param: [
+                'Курсорная пагинация доступна только при сортировке '
+                'по умолчанию.'
+            ]})
+        return super().paginate_queryset(queryset, request, view)
 
 
 class ModifiedPagination(PageNumberPagination):
+    """Постраничная пагинация по ?page=, а при наличии параметра ?cursor=
+    (в том числе пустого для первой страницы) - keyset-пагинация
+    без COUNT(*) и OFFSET."""
+
     page_size_query_param = 'limit'
+    cursor_query_param = IdCursorPagination.cursor_query_param
+
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = IdCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,105 @@
+from django.db import connections, models
+from django.db.models.signals import post_save
+
+
+class InsertIgnoreQuerySet(models.QuerySet):
+
+    def insert_ignore(self, **kwargs):
+        """Создает объект одним запросом
+        INSERT ... ON CONFLICT DO NOTHING RETURNING.
+
+        Возвращает созданный объект или None, если такая строка уже есть
+        (нарушено ограничение уникальности). В отличие от проверки
+        exists() и последующего create() не падает с IntegrityError
+        при одновременных запросах.
+        """
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        opts = self.model._meta
+        obj = self.model(**kwargs)
+        columns, values = [], []
+        for field in opts.local_concrete_fields:
+            if field.primary_key:
+                continue
+            columns.append(quote(field.column))
+            values.append(field.get_db_prep_save(
+                field.pre_save(obj, add=True), connection
+            ))
+        sql = (
+            f'INSERT INTO {quote(opts.db_table)} ({", ".join(columns)}) '
+            f'VALUES ({", ".join(["%s"] * len(values))}) '
+            f'ON CONFLICT DO NOTHING RETURNING {quote(opts.pk.column)}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, values)
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        obj.pk = row[0]
+        obj._state.adding = False
+        obj._state.db = self.db
+        post_save.send(
+            sender=self.model, instance=obj, created=True, update_fields=None,
+            raw=False, using=self.db
+        )
+        return obj
+
+    def bulk_insert_ignore(self, objs, field_name):
+        """Вставляет объекты одним запросом
+        INSERT ... ON CONFLICT DO NOTHING RETURNING.
+
+        Возвращает значения поля field_name только у действительно
+        вставленных строк: строки, уже добавленные другим запросом, в
+        результат не попадают. Сигналы, как и у bulk_create(),
+        не отправляются.
+        """
+        if not objs:
+            return []
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        opts = self.model._meta
+        fields = [
+            field for field in opts.local_concrete_fields
+            if not field.primary_key
+        ]
+        rows, values = [], []
+        for obj in objs:
+            rows.append(f'({", ".join(["%s"] * len(fields))})')
+            values.extend(
+                field.get_db_prep_save(
+                    field.pre_save(obj, add=True), connection
+                )
+                for field in fields
+            )
+        columns = ', '.join(quote(field.column) for field in fields)
+        column = opts.get_field(field_name).column
+        sql = (
+            f'INSERT INTO {quote(opts.db_table)} ({columns}) '
+            f'VALUES {", ".join(rows)} '
+            f'ON CONFLICT DO NOTHING RETURNING {quote(column)}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, values)
+            return [row[0] for row in cursor.fetchall()]
+
+    def delete_returning(self, field_name):
+        """Удаляет строки выборки одним запросом DELETE ... RETURNING
+        и возвращает значения поля field_name удаленных строк.
+
+        Сигналы pre_delete/post_delete не отправляются и каскадное
+        удаление не выполняется: вызывающий код сам обновляет то, что
+        обычно делают обработчики сигналов.
+        """
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        opts = self.model._meta
+        column = opts.get_field(field_name).column
+        subquery, params = self.values('pk').query.sql_with_params()
+        sql = (
+            f'DELETE FROM {quote(opts.db_table)} '
+            f'WHERE {quote(opts.pk.column)} IN ({subquery}) '
+            f'RETURNING {quote(column)}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,51 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+# Даты и время форматирует JSONEncoder из DRF (UTC как Z), ключи-числа
+# приводятся к строкам, как в json.dumps.
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson.
+
+    Выдает те же байты, что и JSONRenderer с настройками по умолчанию
+    (компактный вывод, UTF-8 без экранирования, экранированные U+2028
+    и U+2029). Если клиент просит отступы или orjson не может
+    сериализовать данные (например, целое больше 64 бит), рендеринг
+    отдается стандартному JSONRenderer.
+
+    Отличия остаются только у чисел с плавающей точкой: экспонента
+    пишется без знака и ведущего нуля (1e16 вместо 1e+16), а NaN и
+    бесконечность выводятся как null вместо ошибки. В ответах API таких
+    чисел нет.
+    """
+
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if (self.get_indent(accepted_media_type, renderer_context)
+                or not self.compact or not self.strict):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        try:
+            content = orjson.dumps(
+                data, default=self.encoder.default, option=ORJSON_OPTIONS
+            )
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        return content.replace(
+            LINE_SEPARATOR, b'\\u2028'
+        ).replace(
+            PARAGRAPH_SEPARATOR, b'\\u2029'
+        )
@@ -0,0 +1,93 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+from rest_framework.fields import Field
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.THUMBNAIL_WORKERS,
+    thread_name_prefix='thumbnails'
+)
+
+
+def thumbnail_name(name, size):
+    """Имя уменьшенной копии вычисляется из имени оригинала, поэтому
+    ссылку на нее можно отдать без обращения к базе и хранилищу.
+
+    Имя оригинала сохраняется целиком: по нему nginx отдает оригинал,
+    пока миниатюра не создана (см. infra/nginx.conf).
+    """
+    return f'thumbnails/{size}/{name}.webp'
+
+
+def make_thumbnails(name, sizes):
+    """Сохраняет уменьшенные копии изображения name в формате WebP."""
+    with default_storage.open(name) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    for size in sizes:
+        thumbnail = image.copy()
+        thumbnail.thumbnail(settings.THUMBNAIL_SIZES[size])
+        content = BytesIO()
+        thumbnail.save(
+            content, 'WEBP', quality=settings.THUMBNAIL_QUALITY
+        )
+        path = thumbnail_name(name, size)
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        default_storage.save(path, ContentFile(content.getvalue()))
+
+
+def _make_thumbnails_logged(name, sizes):
+    try:
+        make_thumbnails(name, sizes)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+
+
+def schedule_thumbnails(field_file, sizes):
+    """Ставит создание миниатюр в пул потоков после фиксации транзакции,
+    чтобы не задерживать ответ на запрос."""
+    if not field_file:
+        return
+    name = field_file.name
+    transaction.on_commit(
+        lambda: executor.submit(_make_thumbnails_logged, name, sizes)
+    )
+
+
+def thumbnail_urls(field_file, sizes, request=None):
+    """Ссылки на миниатюры изображения по размерам. Наличие файлов
+    не проверяется: пока миниатюра не готова, nginx отдает по ее ссылке
+    оригинал."""
+    if not field_file:
+        return None
+    urls = {}
+    for size in sizes:
+        url = default_storage.url(thumbnail_name(field_file.name, size))
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        urls[size] = url
+    return urls
+
+
+class ThumbnailsField(Field):
+
+    def __init__(self, sizes, **kwargs):
+        kwargs['read_only'] = True
+        self.sizes = sizes
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return thumbnail_urls(
+            value, self.sizes, self.context.get('request')
+        )
@@ -3,6 +3,7 @@ from datetime import timedelta
 from pathlib import Path
 
 import django
+from django.core.exceptions import ImproperlyConfigured
 from django.utils.encoding import smart_str
 from dotenv import load_dotenv
 
@@ -35,6 +36,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -93,6 +95,24 @@ DATABASES = {
     }
 }
 
+# Общий кэш воркеров (memcached): версии списков покупок, короткие ссылки.
+# Без CACHE_LOCATION кэш живет в памяти процесса, и сброс кэша в одном
+# воркере не виден остальным, поэтому gunicorn должен работать с одним
+# воркером.
+CACHE_LOCATION = os.getenv('CACHE_LOCATION')
+if CACHE_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': CACHE_LOCATION,
+        }
+    }
+elif int(os.getenv('WEB_CONCURRENCY', 1)) > 1:
+    raise ImproperlyConfigured(
+        'Для нескольких воркеров gunicorn (WEB_CONCURRENCY) нужен общий '
+        'кэш: задайте CACHE_LOCATION'
+    )
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -131,4 +151,47 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 MAX_MODEL_VALUE = 32000
 MIN_MODEL_VALUE = 1
-SHORT_LINK_LEN = 3
+SEARCH_CONFIG = 'russian'
+TRENDING_WINDOW_DAYS = 7
+TRENDING_HALF_LIFE_DAYS = 2
+TRENDING_SIZE = 100
+TRENDING_REFRESH_INTERVAL = 15 * 60
+TRENDING_CACHE_TIMEOUT = 60
+COOKABLE_SIZE = 20
+COOKABLE_INDEX_TIMEOUT = 5 * 60
+SHORT_LINK_MIN_LEN = 5
+SHORT_LINK_ALPHABET = (
+    'HJkGvCZrBXq9oxznaj1ip5mEK20LusW6IFdVUP8fMRQbAghD3e7YywtT4NlcOS'
+)
+SHORT_LINK_MULTIPLIER = 2654435761
+SHORT_LINK_LRU_SIZE = 10000
+SHORT_LINK_LRU_TIMEOUT = 60
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60
+INGREDIENT_SEARCH_LIMIT = 20
+BULK_RECIPES_LIMIT = 100
+CATALOG_CACHE_TIMEOUT = 60
+QUERY_PROFILING = os.getenv('QUERY_PROFILING', 'False') == 'True'
+QUERY_PROFILING_SLOWEST = 3
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'False') == 'True'
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'foodgram.queries': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+THUMBNAIL_SIZES = {
+    'list': (600, 600),
+    'detail': (1200, 1200),
+    'avatar': (200, 200),
+}
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_WORKERS = 2
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
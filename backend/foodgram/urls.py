@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from recipes.urls import short_link_urlpatterns
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('recipes.urls')),
     path('api/', include('users.urls')),
-    path('s/', include('recipes.urls')),
+    path('s/', include(short_link_urlpatterns)),
 ]
@@ -24,9 +24,10 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'name',
         'author',
-        'is_favorited_count',
+        'favorites_count',
+        'in_carts_count',
     )
-    readonly_fields = ('is_favorited_count',)
+    readonly_fields = ('favorites_count', 'in_carts_count')
     search_fields = (
         'name',
         'author__username',
@@ -34,10 +35,6 @@ class RecipeAdmin(admin.ModelAdmin):
     list_filter = ('tags',)
     filter_horizontal = ('tags',)
 
-    def is_favorited_count(self, obj):
-        return obj.is_favorited.count()
-    is_favorited_count.short_description = 'Добавления в избранное'
-
 
 class TagAdmin(admin.ModelAdmin):
     list_display = (
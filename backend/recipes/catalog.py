@@ -0,0 +1,94 @@
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+from .models import Ingredient, Tag
+from .serializers import IngredientSerializer, TagSerializer
+from .versions import bump_version, get_version
+
+CatalogEntry = namedtuple(
+    'CatalogEntry', ('version', 'content', 'etag', 'last_modified', 'built')
+)
+
+
+class CatalogCache:
+    """Кэш справочника (тегов, ингредиентов) в памяти процесса.
+
+    Хранит уже отрендеренный JSON всего списка. Версия справочника лежит
+    в общем кэше: сигналы моделей меняют ее, и каждый воркер перестраивает
+    свою копию при следующем запросе. CATALOG_CACHE_TIMEOUT ограничивает
+    жизнь копии, если версия в кэше пропала.
+    """
+
+    def __init__(self, model, serializer_class):
+        self.model = model
+        self.serializer_class = serializer_class
+        self.version_key = f'catalog_version:{model._meta.model_name}'
+        self._entry = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        bump_version(self.version_key)
+
+    def get(self):
+        version = get_version(self.version_key)
+        entry = self._entry
+        if entry is None or not self._is_fresh(entry, version):
+            with self._lock:
+                entry = self._entry
+                if entry is None or not self._is_fresh(entry, version):
+                    entry = self._entry = self._build(entry, version)
+        return entry
+
+    def _is_fresh(self, entry, version):
+        return (entry.version == version
+                and time.monotonic() - entry.built
+                < settings.CATALOG_CACHE_TIMEOUT)
+
+    def _build(self, previous, version):
+        data = self.serializer_class(
+            self.model.objects.all(), many=True
+        ).data
+        content = JSONRenderer().render(data)
+        etag = f'"{hashlib.md5(content).hexdigest()}"'
+        last_modified = time.time()
+        if previous is not None and previous.etag == etag:
+            last_modified = previous.last_modified
+        return CatalogEntry(
+            version, content, etag, last_modified, time.monotonic()
+        )
+
+
+class CatalogListMixin:
+    """Отдает нефильтрованный список справочника из CatalogCache
+    с поддержкой условных GET-запросов."""
+
+    catalog_cache = None
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        entry = self.catalog_cache.get()
+        response = get_conditional_response(
+            request,
+            etag=entry.etag,
+            last_modified=int(entry.last_modified),
+        )
+        if response is None:
+            response = HttpResponse(
+                entry.content, content_type='application/json'
+            )
+        response['ETag'] = entry.etag
+        response['Last-Modified'] = http_date(entry.last_modified)
+        return response
+
+
+tag_catalog = CatalogCache(Tag, TagSerializer)
+ingredient_catalog = CatalogCache(Ingredient, IngredientSerializer)
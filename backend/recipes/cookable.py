@@ -0,0 +1,89 @@
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from .models import RecipeIngredient
+
+
+class IngredientIndex:
+    """Обратный индекс ингредиент -> рецепты в памяти процесса.
+
+    Позволяет ранжировать рецепты по числу имеющихся у пользователя
+    ингредиентов без соединения таблиц в базе: время ответа зависит
+    от длины списков рецептов для переданных ингредиентов, а не от
+    общего числа рецептов. Сериализатор рецепта обновляет индекс
+    текущего процесса, остальные воркеры перестраивают его по истечении
+    COOKABLE_INDEX_TIMEOUT.
+    """
+
+    def __init__(self):
+        self._recipes = None
+        self._postings = None
+        self._loaded = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._recipes = None
+
+    def update(self, recipe_id, ingredient_ids):
+        with self._lock:
+            if self._recipes is None:
+                return
+            self._discard(recipe_id)
+            ingredient_ids = frozenset(ingredient_ids)
+            self._recipes[recipe_id] = ingredient_ids
+            for ingredient_id in ingredient_ids:
+                self._postings[ingredient_id].add(recipe_id)
+
+    def remove(self, recipe_id):
+        with self._lock:
+            if self._recipes is not None:
+                self._discard(recipe_id)
+
+    def match(self, ingredient_ids, limit=None):
+        """Возвращает id рецептов, в которых есть хотя бы один из
+        ingredient_ids: сначала те, где совпало больше ингредиентов,
+        затем те, где меньше недостающих, затем новые."""
+        with self._lock:
+            self._ensure_loaded()
+            recipes, postings = self._recipes, self._postings
+            covered = Counter()
+            for ingredient_id in set(ingredient_ids):
+                covered.update(postings.get(ingredient_id, ()))
+            ranked = heapq.nsmallest(
+                limit or len(covered),
+                covered.items(),
+                key=lambda item: (
+                    -item[1], len(recipes[item[0]]) - item[1], -item[0]
+                )
+            )
+        return [recipe_id for recipe_id, _ in ranked]
+
+    def _discard(self, recipe_id):
+        for ingredient_id in self._recipes.pop(recipe_id, ()):
+            self._postings[ingredient_id].discard(recipe_id)
+
+    def _ensure_loaded(self):
+        if (self._recipes is None or time.monotonic() - self._loaded
+                > settings.COOKABLE_INDEX_TIMEOUT):
+            self._recipes, self._postings = self._load()
+            self._loaded = time.monotonic()
+
+    def _load(self):
+        recipes = defaultdict(set)
+        postings = defaultdict(set)
+        for recipe_id, ingredient_id in RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator():
+            recipes[recipe_id].add(ingredient_id)
+            postings[ingredient_id].add(recipe_id)
+        return (
+            {recipe_id: frozenset(ids) for recipe_id, ids in recipes.items()},
+            postings
+        )
+
+
+ingredient_index = IngredientIndex()
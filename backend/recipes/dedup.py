@@ -0,0 +1,62 @@
+from django.conf import settings
+
+
+def find_duplicates(ingredient_model):
+    """Сопоставляет каждому дублю ингредиента оставляемый ингредиент
+    с тем же названием (без учета регистра) и единицей измерения.
+    Оставляется ингредиент с наименьшим id."""
+    keep, duplicates = {}, {}
+    rows = ingredient_model.objects.order_by('id').values_list(
+        'id', 'name', 'measurement_unit'
+    )
+    for pk, name, unit in rows.iterator():
+        key = (name.lower(), unit)
+        if key in keep:
+            duplicates[pk] = keep[key]
+        else:
+            keep[key] = pk
+    return duplicates
+
+
+def merge_duplicate_ingredients(ingredient_model, recipe_ingredient_model):
+    """Объединяет дубли ингредиентов: переносит на оставляемый ингредиент
+    строки RecipeIngredient (складывая количества, если в рецепте уже
+    есть оба) и удаляет дубли.
+
+    Модели передаются параметрами, чтобы функцию можно было вызвать
+    из миграции. Возвращает (число удаленных дублей, id затронутых
+    рецептов).
+    """
+    duplicates = find_duplicates(ingredient_model)
+    if not duplicates:
+        return 0, set()
+    moved = list(recipe_ingredient_model.objects.filter(
+        ingredient_id__in=duplicates
+    ))
+    recipe_ids = {item.recipe_id for item in moved}
+    kept = {
+        (item.recipe_id, item.ingredient_id): item
+        for item in recipe_ingredient_model.objects.filter(
+            recipe_id__in=recipe_ids,
+            ingredient_id__in=set(duplicates.values())
+        )
+    }
+    changed, removed = {}, []
+    for item in moved:
+        key = (item.recipe_id, duplicates[item.ingredient_id])
+        target = kept.get(key)
+        if target is None:
+            item.ingredient_id = key[1]
+            kept[key] = changed[item.id] = item
+        else:
+            target.amount = min(
+                target.amount + item.amount, settings.MAX_MODEL_VALUE
+            )
+            changed[target.id] = target
+            removed.append(item.id)
+    recipe_ingredient_model.objects.bulk_update(
+        changed.values(), ['ingredient', 'amount'], batch_size=1000
+    )
+    recipe_ingredient_model.objects.filter(id__in=removed).delete()
+    ingredient_model.objects.filter(id__in=duplicates).delete()
+    return len(duplicates), recipe_ids
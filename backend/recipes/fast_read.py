@@ -0,0 +1,86 @@
+from core.thumbnails import thumbnail_urls
+from .serializers import RECIPE_THUMBNAILS
+
+
+def file_url(field_file, request):
+    """Как ImageField.to_representation в DRF."""
+    if not field_file:
+        return None
+    if request is not None:
+        return request.build_absolute_uri(field_file.url)
+    return field_file.url
+
+
+def author_to_dict(user, request):
+    """То же, что ModifiedUserSerializer, для автора из
+    Recipe.objects.for_read()."""
+    if user is None:
+        return None
+    return {
+        'email': user.email,
+        'id': user.id,
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'is_subscribed': user.is_subscribed,
+        'avatar': file_url(user.avatar, request),
+        'avatar_thumbnails': thumbnail_urls(
+            user.avatar, ('avatar',), request
+        ),
+    }
+
+
+def recipe_to_dict(recipe, request):
+    """То же, что RecipeReadSerializer, для рецепта из
+    Recipe.objects.for_read(): обходит предзагруженные связи напрямую,
+    без создания вложенных сериализаторов."""
+    return {
+        'id': recipe.id,
+        'tags': [
+            {'id': tag.id, 'name': tag.name, 'slug': tag.slug}
+            for tag in recipe.tags.all()
+        ],
+        'author': author_to_dict(recipe.author, request),
+        'ingredients': [
+            {
+                'id': item.ingredient.id,
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.ingredients_in_resipe.all()
+        ],
+        'is_favorited': recipe.favorited,
+        'is_in_shopping_cart': recipe.in_shopping_cart,
+        'name': recipe.name,
+        'image': file_url(recipe.image, request),
+        'thumbnails': thumbnail_urls(
+            recipe.image, RECIPE_THUMBNAILS, request
+        ),
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+    }
+
+
+class RecipeFastReadSerializer:
+    """Замена RecipeReadSerializer только для чтения с тем же интерфейсом
+    (instance, many, context, data), но без полей DRF.
+
+    Принимает только рецепты из Recipe.objects.for_read(). Совпадение
+    вывода с RecipeReadSerializer проверяют RecipeFastReadTest и, на
+    рабочих данных, команда check_recipe_fast_read.
+    """
+
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+
+    @property
+    def data(self):
+        request = self.context.get('request')
+        if self.many:
+            return [
+                recipe_to_dict(recipe, request) for recipe in self.instance
+            ]
+        return recipe_to_dict(self.instance, request)
@@ -0,0 +1,140 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.db import connection, transaction
+
+from .catalog import ingredient_catalog, tag_catalog
+from .models import Ingredient, Tag
+
+INGREDIENT_FIELDS = ('name', 'measurement_unit')
+TAG_FIELDS = ('name', 'slug')
+
+STAGING_TABLE = 'recipes_ingredient_staging'
+
+# Ингредиенты, которых еще нет в справочнике (название сравнивается без
+# учета регистра по индексу ingredient_name_lower_idx); повторы в файле
+# схлопываются.
+MERGE_INGREDIENTS_SQL = f"""
+    INSERT INTO recipes_ingredient (name, measurement_unit)
+    SELECT DISTINCT ON (lower(staging.name), staging.measurement_unit)
+        staging.name, staging.measurement_unit
+    FROM {STAGING_TABLE} AS staging
+    WHERE NOT EXISTS (
+        SELECT 1 FROM recipes_ingredient AS ingredient
+        WHERE lower(ingredient.name) = lower(staging.name)
+            AND ingredient.measurement_unit = staging.measurement_unit
+    )
+    ORDER BY lower(staging.name), staging.measurement_unit, staging.name
+"""
+
+
+def read_rows(path, fields):
+    """Читает строки справочника из CSV (с заголовком) или JSON
+    (список объектов или фикстура Django) и отдает кортежи fields."""
+    if str(path).endswith('.json'):
+        with open(path, encoding='utf-8') as file:
+            items = json.load(file)
+        for item in items:
+            item = item.get('fields', item)
+            yield tuple(item[field] for field in fields)
+        return
+    with open(path, encoding='utf-8-sig', newline='') as file:
+        for row in csv.DictReader(file):
+            yield tuple(row[field] for field in fields)
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def load_ingredients(rows, batch_size):
+    """Добавляет в справочник отсутствующие ингредиенты.
+
+    Повторная загрузка того же файла ничего не меняет. Возвращает
+    (прочитано строк, добавлено ингредиентов).
+    """
+    if connection.vendor == 'postgresql':
+        result = _copy_ingredients(rows, batch_size)
+    else:
+        result = _bulk_create_ingredients(rows, batch_size)
+    ingredient_catalog.invalidate()
+    return result
+
+
+def _copy_ingredients(rows, batch_size):
+    total = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {STAGING_TABLE} '
+            '(name varchar(128), measurement_unit varchar(64)) '
+            'ON COMMIT DROP'
+        )
+        for batch in batches(rows, batch_size):
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(batch)
+            buffer.seek(0)
+            cursor.copy_expert(
+                # Пустые поля - пустые строки, а не NULL, как при
+                # загрузке через ORM.
+                f'COPY {STAGING_TABLE} (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv, '
+                'FORCE_NOT_NULL (name, measurement_unit))',
+                buffer
+            )
+            total += len(batch)
+        cursor.execute(f'ANALYZE {STAGING_TABLE}')
+        cursor.execute(MERGE_INGREDIENTS_SQL)
+        created = cursor.rowcount
+    return total, created
+
+
+def _bulk_create_ingredients(rows, batch_size):
+    total = 0
+    with transaction.atomic():
+        # ignore_conflicts не сообщает, какие строки вставлены: часть
+        # новых может совпасть с существующими без учета регистра.
+        before = Ingredient.objects.count()
+        for batch in batches(rows, batch_size):
+            total += len(batch)
+            existing = set(Ingredient.objects.filter(
+                name__in={name for name, _ in batch}
+            ).values_list('name', 'measurement_unit'))
+            new = [
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in dict.fromkeys(batch)
+                if (name, unit) not in existing
+            ]
+            Ingredient.objects.bulk_create(
+                new, batch_size=batch_size, ignore_conflicts=True
+            )
+        created = Ingredient.objects.count() - before
+    return total, created
+
+
+def load_tags(rows):
+    """Создает теги или обновляет названия существующих по слагу.
+    Возвращает (прочитано строк, добавлено тегов)."""
+    rows = list(rows)
+    existing = Tag.objects.in_bulk(
+        [slug for _, slug in rows], field_name='slug'
+    )
+    new, changed = [], []
+    for name, slug in rows:
+        tag = existing.get(slug)
+        if tag is None:
+            new.append(Tag(name=name, slug=slug))
+        elif tag.name != name:
+            tag.name = name
+            changed.append(tag)
+    with transaction.atomic():
+        Tag.objects.bulk_update(changed, ['name'])
+        Tag.objects.bulk_create(new)
+    tag_catalog.invalidate()
+    return len(rows), len(new)
@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.renderers import ORJSONRenderer
+from recipes.fast_read import RecipeFastReadSerializer
+from recipes.models import Recipe
+from recipes.serializers import RecipeReadSerializer
+
+User = get_user_model()
+
+CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает побайтно вывод RecipeFastReadSerializer + '
+            'ORJSONRenderer с RecipeReadSerializer + JSONRenderer')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Имя пользователя, от лица которого строится вывод'
+        )
+
+    def handle(self, *args, **options):
+        user = AnonymousUser()
+        if options['user']:
+            user = User.objects.get(username=options['user'])
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        context = {'request': request}
+        mismatched = []
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        # iterator() в Django 3.2 не выполняет prefetch_related, поэтому
+        # рецепты загружаются пачками.
+        for start in range(0, len(recipe_ids), CHUNK_SIZE):
+            self.compare(
+                Recipe.objects.for_read(user).filter(
+                    id__in=recipe_ids[start:start + CHUNK_SIZE]
+                ),
+                context, mismatched
+            )
+        if mismatched:
+            raise CommandError(
+                f'Вывод отличается для рецептов: {mismatched}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Вывод совпадает для {len(recipe_ids)} рецептов'
+        ))
+
+    def compare(self, recipes, context, mismatched):
+        for recipe in recipes:
+            expected = JSONRenderer().render(
+                RecipeReadSerializer(recipe, context=context).data
+            )
+            actual = ORJSONRenderer().render(
+                RecipeFastReadSerializer(recipe, context=context).data
+            )
+            if actual != expected:
+                mismatched.append(recipe.id)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.catalog import ingredient_catalog
+from recipes.cookable import ingredient_index
+from recipes.dedup import merge_duplicate_ingredients
+from recipes.models import Ingredient, RecipeIngredient
+from recipes.shopping_list import bump_shopping_lists_version
+
+
+class Command(BaseCommand):
+    help = ('Объединяет ингредиенты с одинаковыми названием (без учета '
+            'регистра) и единицей измерения')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            merged, recipe_ids = merge_duplicate_ingredients(
+                Ingredient, RecipeIngredient
+            )
+        if merged:
+            ingredient_catalog.invalidate()
+            ingredient_index.invalidate()
+            bump_shopping_lists_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено дублей: {merged}, затронуто рецептов: '
+            f'{len(recipe_ids)}'
+        ))
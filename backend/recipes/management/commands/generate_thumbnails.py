@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.thumbnails import make_thumbnails
+from recipes.models import Recipe
+from recipes.serializers import RECIPE_THUMBNAILS
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Создает миниатюры для уже загруженных изображений'
+
+    def handle(self, *args, **options):
+        sources = (
+            (Recipe.objects.exclude(image=''), 'image', RECIPE_THUMBNAILS),
+            (User.objects.exclude(avatar='').exclude(avatar=None),
+             'avatar', ('avatar',)),
+        )
+        total = 0
+        for queryset, field, sizes in sources:
+            for name in queryset.values_list(field, flat=True).iterator():
+                try:
+                    make_thumbnails(name, sizes)
+                except (OSError, ValueError) as error:
+                    self.stderr.write(f'{name}: {error}')
+                    continue
+                total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры созданы для {total} изображений'
+        ))
@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.loaders import (INGREDIENT_FIELDS, TAG_FIELDS, load_ingredients,
+                             load_tags, read_rows)
+
+
+class Command(BaseCommand):
+    help = ('Загружает теги и ингредиенты из CSV или JSON. '
+            'Повторный запуск не создает дубликатов')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients',
+            default=settings.BASE_DIR / 'db_data' / 'ingredients.csv',
+            help='Файл с ингредиентами (name, measurement_unit)'
+        )
+        parser.add_argument(
+            '--tags',
+            default=settings.BASE_DIR / 'db_data' / 'tags.csv',
+            help='Файл с тегами (name, slug)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Число строк в одной пачке'
+        )
+
+    def handle(self, *args, **options):
+        self.report('Теги', load_tags, read_rows(options['tags'], TAG_FIELDS))
+        self.report(
+            'Ингредиенты', load_ingredients,
+            read_rows(options['ingredients'], INGREDIENT_FIELDS),
+            options['batch_size']
+        )
+
+    def report(self, title, loader, *args):
+        started = time.monotonic()
+        total, created = loader(*args)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{title}: прочитано {total}, добавлено {created} '
+            f'за {elapsed:.2f} с ({total / max(elapsed, 1e-6):.0f} строк/с)'
+        ))
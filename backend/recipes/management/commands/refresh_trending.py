@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинг популярных рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Пересчитывать каждые TRENDING_REFRESH_INTERVAL секунд'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            count = refresh_trending()
+            self.stdout.write(self.style.SUCCESS(
+                f'Рецептов в рейтинге: {count}'
+            ))
+            if not options['loop']:
+                return
+            time.sleep(settings.TRENDING_REFRESH_INTERVAL)
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:12
+
+from django.db import migrations
+
+from recipes.dedup import merge_duplicate_ingredients
+
+
+def merge_duplicates(apps, schema_editor):
+    merge_duplicate_ingredients(
+        apps.get_model('recipes', 'Ingredient'),
+        apps.get_model('recipes', 'RecipeIngredient'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_merge_duplicate_ingredients'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX ingredient_name_lower_idx '
+            'ON recipes_ingredient (lower(name), measurement_unit)',
+            'DROP INDEX ingredient_name_lower_idx',
+        ),
+    ]
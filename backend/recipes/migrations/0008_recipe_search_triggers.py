@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from recipes.search import (create_search_triggers, drop_search_triggers,
+                            index_recipes)
+
+
+def create_triggers(apps, schema_editor):
+    connection = schema_editor.connection
+    create_search_triggers(connection)
+    index_recipes(connection=connection)
+
+
+def drop_triggers(apps, schema_editor):
+    drop_search_triggers(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_ingredient_natural_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -0,0 +1,43 @@
+import django.db.models.functions.text
+from django.db import migrations, models
+
+from recipes.dedup import merge_duplicate_ingredients
+
+CREATE_INDEX_SQL = (
+    'CREATE {unique}INDEX ingredient_name_lower_idx '
+    'ON recipes_ingredient (lower(name), measurement_unit)'
+)
+DROP_INDEX_SQL = 'DROP INDEX ingredient_name_lower_idx'
+
+
+def merge_duplicates(apps, schema_editor):
+    merge_duplicate_ingredients(
+        apps.get_model('recipes', 'Ingredient'),
+        apps.get_model('recipes', 'RecipeIngredient'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_ingredient_name_trgm_idx'),
+    ]
+
+    operations = [
+        # Дубли могли появиться после 0006, уникальный индекс их не примет.
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    [DROP_INDEX_SQL, CREATE_INDEX_SQL.format(unique='UNIQUE ')],
+                    [DROP_INDEX_SQL, CREATE_INDEX_SQL.format(unique='')],
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='ingredient',
+                    index=models.Index(django.db.models.functions.text.Lower('name'), models.F('measurement_unit'), name='ingredient_name_lower_idx'),
+                ),
+            ],
+        ),
+    ]
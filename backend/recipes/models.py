@@ -1,7 +1,15 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models import (Case, Count, Exists, F, OuterRef, Prefetch,
+                              Subquery, Value, When, Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import (Coalesce, Greatest, Lower,
+                                        RowNumber)
+
+from core.querysets import InsertIgnoreQuerySet
 
 User = get_user_model()
 
@@ -29,6 +37,43 @@ class Tag(models.Model):
         return self.name
 
 
+class IngredientQuerySet(models.QuerySet):
+
+    def search(self, value, limit=settings.INGREDIENT_SEARCH_LIMIT):
+        """Подсказки для поиска ингредиента: сначала совпадения по началу
+        названия, затем по вхождению, не больше limit результатов.
+
+        Совпадения по началу ищутся по индексу ingredient_name_prefix_idx,
+        по вхождению (только если первых не хватило до limit) - по
+        триграммному индексу ingredient_name_trgm_idx.
+        """
+        ids = list(self.filter(name__startswith=value).order_by(
+            'name'
+        ).values_list('pk', flat=True)[:limit])
+        if len(ids) < limit:
+            ids += self.filter(name__contains=value).exclude(
+                name__startswith=value
+            ).order_by('name').values_list(
+                'pk', flat=True
+            )[:limit - len(ids)]
+        # Результат остается запросом, чтобы к нему можно было применять
+        # дальнейшие фильтры (например, в retrieve).
+        return self.filter(pk__in=ids).annotate(
+            prefix_rank=Case(
+                When(name__startswith=value, then=Value(0)),
+                default=Value(1),
+                output_field=models.IntegerField(),
+            )
+        ).order_by('prefix_rank', 'name')
+
+    def get_by_natural_key(self, name, measurement_unit):
+        """Ищет ингредиент по названию без учета регистра
+        (по уникальному индексу ingredient_name_lower_idx)."""
+        return self.annotate(name_lower=Lower('name')).get(
+            name_lower=Lower(Value(name)), measurement_unit=measurement_unit
+        )
+
+
 class Ingredient(models.Model):
 
     name = models.CharField(
@@ -40,14 +85,108 @@ class Ingredient(models.Model):
         max_length=64
     )
 
+    objects = IngredientQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ['name']
+        indexes = [
+            models.Index(
+                fields=['name'],
+                name='ingredient_name_prefix_idx',
+                opclasses=['varchar_pattern_ops'],
+            ),
+            # В базе индекс уникальный (миграция 0010): UniqueConstraint
+            # по выражениям появился только в Django 4.0.
+            models.Index(
+                Lower('name'), F('measurement_unit'),
+                name='ingredient_name_lower_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def natural_key(self):
+        return (self.name, self.measurement_unit)
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_flags(self, user):
+        """Аннотирует рецепты флагами избранного и корзины пользователя."""
+        if user.is_anonymous:
+            return self.annotate(
+                favorited=models.Value(False, models.BooleanField()),
+                in_shopping_cart=models.Value(False, models.BooleanField()),
+            )
+        return self.annotate(
+            favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+        )
+
+    def for_read(self, user):
+        """Queryset для чтения: страница рецептов за фиксированное
+        число запросов независимо от ее размера."""
+        return self.with_user_flags(user).prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredients_in_resipe',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                ).order_by('ingredient__name'),
+            ),
+            Prefetch('author', queryset=User.objects.with_subscription(user)),
+        ).defer('search_vector')
+
+    def latest_per_author(self, limit):
+        """Не больше limit последних рецептов каждого автора.
+
+        Номера рецептов внутри автора считаются одним оконным запросом
+        ROW_NUMBER() OVER (PARTITION BY author), который подставляется
+        подзапросом в фильтр.
+        """
+        ranked = self.annotate(recipe_rank=Window(
+            expression=RowNumber(),
+            partition_by=F('author'),
+            order_by=F('id').desc(),
+        )).order_by().values('id', 'recipe_rank')
+        sql, params = ranked.query.sql_with_params()
+        return self.model.objects.filter(id__in=RawSQL(
+            f'SELECT id FROM ({sql}) ranked WHERE recipe_rank <= %s',
+            (*params, limit)
+        ))
+
+    def change_counter(self, field, delta):
+        """Атомарно изменяет счетчик field на delta, не опуская его
+        ниже нуля."""
+        return self.update(**{field: Greatest(F(field) + delta, 0)})
+
+    def reconcile_counters(self):
+        """Пересчитывает счетчики избранного и корзин по таблицам
+        связей."""
+        return self.update(**{
+            model.counter_field: Coalesce(Subquery(
+                model.objects.filter(
+                    recipe=OuterRef('pk')
+                ).order_by().values('recipe').annotate(
+                    total=Count('id')
+                ).values('total')
+            ), 0)
+            for model in (Favorite, ShoppingCart)
+        })
+
 
 class Recipe(models.Model):
 
@@ -105,15 +244,56 @@ class Recipe(models.Model):
             )
         ]
     )
+    favorites_count = models.PositiveIntegerField(
+        'Добавления в избранное',
+        default=0,
+        editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'Добавления в корзину',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ['-id']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-favorites_count', '-id'],
+                name='recipe_popularity_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    # Поля, которые меняет только база: счетчики (change_counter) и
+    # поисковый вектор (триггеры).
+    DATABASE_MANAGED_FIELDS = (
+        'favorites_count', 'in_carts_count', 'search_vector'
+    )
+
+    def save(self, *args, **kwargs):
+        """Полное сохранение не записывает DATABASE_MANAGED_FIELDS:
+        значения в памяти могли устареть и затерли бы параллельные
+        изменения счетчиков."""
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.DATABASE_MANAGED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class RecipeIngredient(models.Model):
 
@@ -169,6 +349,15 @@ class Favorite(models.Model):
         related_name='favorites',
         verbose_name='Рецепт',
     )
+    created = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
+
+    objects = InsertIgnoreQuerySet.as_manager()
+
+    counter_field = 'favorites_count'
 
     class Meta:
         verbose_name = 'Избранное'
@@ -197,6 +386,15 @@ class ShoppingCart(models.Model):
         related_name='shopping_cart',
         verbose_name='Рецепт',
     )
+    created = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
+
+    objects = InsertIgnoreQuerySet.as_manager()
+
+    counter_field = 'in_carts_count'
 
     class Meta:
         verbose_name = 'Корзина покупок'
@@ -237,3 +435,27 @@ class ShortLink(models.Model):
 
     def __str__(self):
         return f'{self.recipe} short link'
+
+
+class TrendingRecipe(models.Model):
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='trending',
+        verbose_name='Рецепт',
+    )
+    score = models.FloatField(
+        'Рейтинг'
+    )
+    refreshed = models.DateTimeField(
+        'Дата пересчета'
+    )
+
+    class Meta:
+        verbose_name = 'Популярный рецепт'
+        verbose_name_plural = 'Популярные рецепты'
+        ordering = ['-score', '-recipe_id']
+
+    def __str__(self):
+        return f'{self.recipe} - {self.score:.2f}'
@@ -0,0 +1,313 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection as default_connection, connections
+from django.db.models import F
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'recipes_recipe_fts'
+
+# Название важнее ингредиентов, ингредиенты важнее описания.
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector({config}, {name}), 'A')
+    || setweight(to_tsvector({config}, coalesce((
+        SELECT string_agg(ingredient.name, ' ')
+        FROM recipes_recipeingredient AS item
+        JOIN recipes_ingredient AS ingredient
+            ON ingredient.id = item.ingredient_id
+        WHERE item.recipe_id = {recipe_id}
+    ), '')), 'B')
+    || setweight(to_tsvector({config}, {text}), 'C')
+"""
+
+POSTGRES_INDEX_SQL = (
+    'UPDATE recipes_recipe AS recipe SET search_vector = '
+    + SEARCH_VECTOR_SQL.format(
+        config='%(config)s::regconfig', name='recipe.name',
+        recipe_id='recipe.id', text='recipe.text'
+    )
+)
+
+SQLITE_INGREDIENTS_SQL = """coalesce((
+    SELECT group_concat(ingredient.name, ' ')
+    FROM recipes_recipeingredient AS item
+    JOIN recipes_ingredient AS ingredient
+        ON ingredient.id = item.ingredient_id
+    WHERE item.recipe_id = {recipe_id}
+), '')"""
+
+SQLITE_INDEX_SQL = f"""
+    INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text)
+    SELECT
+        recipe.id, recipe.name,
+        {SQLITE_INGREDIENTS_SQL.format(recipe_id='recipe.id')}, recipe.text
+    FROM recipes_recipe AS recipe
+"""
+
+# Индекс поддерживают триггеры, поэтому он не зависит от того, как
+# изменили рецепт: через API, админку или ORM. Конфигурация поиска
+# подставляется в тело функций при создании.
+POSTGRES_TRIGGERS_SQL = [
+    """
+    CREATE FUNCTION recipes_recipe_search_vector(bigint, text, text)
+    RETURNS tsvector LANGUAGE sql STABLE AS $$ SELECT """
+    + SEARCH_VECTOR_SQL.format(
+        config='%(config)s::regconfig', name='$2', recipe_id='$1', text='$3'
+    ) + '$$',
+    """
+    CREATE FUNCTION recipes_recipe_search_trigger() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.search_vector := recipes_recipe_search_vector(
+            NEW.id, NEW.name, NEW.text
+        );
+        RETURN NEW;
+    END $$
+    """,
+    """
+    CREATE TRIGGER recipes_recipe_search
+    BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+    FOR EACH ROW EXECUTE FUNCTION recipes_recipe_search_trigger()
+    """,
+    """
+    CREATE FUNCTION recipes_reindex_recipes(recipe_ids bigint[])
+    RETURNS void LANGUAGE sql AS $$
+        UPDATE recipes_recipe AS recipe
+        SET search_vector = recipes_recipe_search_vector(
+            recipe.id, recipe.name, recipe.text
+        )
+        WHERE recipe.id = ANY(recipe_ids)
+    $$
+    """,
+    """
+    CREATE FUNCTION recipes_recipeingredient_search_trigger()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM recipes_reindex_recipes(
+                ARRAY(SELECT DISTINCT recipe_id FROM new_rows)
+            );
+        ELSIF TG_OP = 'DELETE' THEN
+            PERFORM recipes_reindex_recipes(
+                ARRAY(SELECT DISTINCT recipe_id FROM old_rows)
+            );
+        ELSE
+            PERFORM recipes_reindex_recipes(ARRAY(
+                SELECT recipe_id FROM old_rows
+                UNION SELECT recipe_id FROM new_rows
+            ));
+        END IF;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE TRIGGER recipes_recipeingredient_search_insert
+    AFTER INSERT ON recipes_recipeingredient
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT
+    EXECUTE FUNCTION recipes_recipeingredient_search_trigger()
+    """,
+    """
+    CREATE TRIGGER recipes_recipeingredient_search_update
+    AFTER UPDATE ON recipes_recipeingredient
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION recipes_recipeingredient_search_trigger()
+    """,
+    """
+    CREATE TRIGGER recipes_recipeingredient_search_delete
+    AFTER DELETE ON recipes_recipeingredient
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT
+    EXECUTE FUNCTION recipes_recipeingredient_search_trigger()
+    """,
+    """
+    CREATE FUNCTION recipes_ingredient_search_trigger() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        PERFORM recipes_reindex_recipes(ARRAY(
+            SELECT DISTINCT item.recipe_id
+            FROM recipes_recipeingredient AS item
+            JOIN new_rows ON new_rows.id = item.ingredient_id
+            JOIN old_rows ON old_rows.id = new_rows.id
+            WHERE old_rows.name IS DISTINCT FROM new_rows.name
+        ));
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE TRIGGER recipes_ingredient_search
+    AFTER UPDATE ON recipes_ingredient
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION recipes_ingredient_search_trigger()
+    """,
+]
+
+POSTGRES_DROP_TRIGGERS_SQL = [
+    'DROP TRIGGER recipes_ingredient_search ON recipes_ingredient',
+    'DROP FUNCTION recipes_ingredient_search_trigger()',
+    'DROP TRIGGER recipes_recipeingredient_search_insert '
+    'ON recipes_recipeingredient',
+    'DROP TRIGGER recipes_recipeingredient_search_update '
+    'ON recipes_recipeingredient',
+    'DROP TRIGGER recipes_recipeingredient_search_delete '
+    'ON recipes_recipeingredient',
+    'DROP FUNCTION recipes_recipeingredient_search_trigger()',
+    'DROP FUNCTION recipes_reindex_recipes(bigint[])',
+    'DROP TRIGGER recipes_recipe_search ON recipes_recipe',
+    'DROP FUNCTION recipes_recipe_search_trigger()',
+    'DROP FUNCTION recipes_recipe_search_vector(bigint, text, text)',
+]
+
+SQLITE_REINDEX_INGREDIENTS_SQL = (
+    f'UPDATE {FTS_TABLE} SET ingredients = '
+    + SQLITE_INGREDIENTS_SQL.format(recipe_id=f'{FTS_TABLE}.rowid')
+)
+
+SQLITE_TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER recipes_recipe_fts_insert
+    AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text) VALUES (
+            NEW.id, NEW.name,
+            {SQLITE_INGREDIENTS_SQL.format(recipe_id='NEW.id')}, NEW.text
+        );
+    END
+    """,
+    f"""
+    CREATE TRIGGER recipes_recipe_fts_update
+    AFTER UPDATE OF name, text ON recipes_recipe BEGIN
+        UPDATE {FTS_TABLE} SET name = NEW.name, text = NEW.text
+        WHERE rowid = NEW.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER recipes_recipe_fts_delete
+    AFTER DELETE ON recipes_recipe BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = OLD.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER recipes_recipeingredient_fts_insert
+    AFTER INSERT ON recipes_recipeingredient BEGIN
+        {SQLITE_REINDEX_INGREDIENTS_SQL} WHERE rowid = NEW.recipe_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER recipes_recipeingredient_fts_update
+    AFTER UPDATE OF recipe_id, ingredient_id ON recipes_recipeingredient
+    BEGIN
+        {SQLITE_REINDEX_INGREDIENTS_SQL}
+        WHERE rowid IN (OLD.recipe_id, NEW.recipe_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER recipes_recipeingredient_fts_delete
+    AFTER DELETE ON recipes_recipeingredient BEGIN
+        {SQLITE_REINDEX_INGREDIENTS_SQL} WHERE rowid = OLD.recipe_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER recipes_ingredient_fts_update
+    AFTER UPDATE OF name ON recipes_ingredient BEGIN
+        {SQLITE_REINDEX_INGREDIENTS_SQL} WHERE rowid IN (
+            SELECT recipe_id FROM recipes_recipeingredient
+            WHERE ingredient_id = NEW.id
+        );
+    END
+    """,
+]
+
+SQLITE_DROP_TRIGGERS_SQL = [
+    f'DROP TRIGGER {name}' for name in (
+        'recipes_recipe_fts_insert', 'recipes_recipe_fts_update',
+        'recipes_recipe_fts_delete', 'recipes_recipeingredient_fts_insert',
+        'recipes_recipeingredient_fts_update',
+        'recipes_recipeingredient_fts_delete',
+        'recipes_ingredient_fts_update',
+    )
+]
+
+
+def create_search_triggers(connection=default_connection):
+    """Создаёт триггеры, которые поддерживают поисковый индекс."""
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_TRIGGERS_SQL
+        params = {'config': settings.SEARCH_CONFIG}
+    elif connection.vendor == 'sqlite':
+        statements, params = SQLITE_TRIGGERS_SQL, None
+    else:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql, params)
+
+
+def drop_search_triggers(connection=default_connection):
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_DROP_TRIGGERS_SQL
+    elif connection.vendor == 'sqlite':
+        statements = SQLITE_DROP_TRIGGERS_SQL
+    else:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def index_recipes(recipe_ids=None, connection=default_connection):
+    """Перестраивает поисковый индекс для рецептов recipe_ids
+    (для всех рецептов, если они не переданы).
+
+    В PostgreSQL индекс - столбец tsvector с GIN-индексом, в SQLite -
+    виртуальная таблица FTS5. Текущие изменения индексируют триггеры,
+    функция нужна для первичного заполнения.
+    """
+    if recipe_ids is not None:
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            sql = POSTGRES_INDEX_SQL
+            params = {'config': settings.SEARCH_CONFIG}
+            if recipe_ids is not None:
+                sql += ' WHERE recipe.id = ANY(%(ids)s)'
+                params['ids'] = recipe_ids
+            cursor.execute(sql, params)
+        elif connection.vendor == 'sqlite':
+            where, params = '', []
+            if recipe_ids is not None:
+                placeholders = ', '.join(['%s'] * len(recipe_ids))
+                where = f' WHERE rowid IN ({placeholders})'
+                params = recipe_ids
+            cursor.execute(f'DELETE FROM {FTS_TABLE}{where}', params)
+            cursor.execute(
+                SQLITE_INDEX_SQL + where.replace('rowid', 'recipe.id'),
+                params
+            )
+
+
+def search_recipes(queryset, value):
+    """Полнотекстовый поиск рецептов, результаты упорядочены
+    по релевантности."""
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        query = SearchQuery(
+            value, config=settings.SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-id')
+    if vendor == 'sqlite':
+        terms = ' '.join(f'"{word}"*' for word in re.findall(r'\w+', value))
+        if not terms:
+            return queryset.none()
+        match = f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid {match}', (terms,))
+        ).annotate(search_rank=RawSQL(
+            f'SELECT bm25({FTS_TABLE}) {match} '
+            f'AND rowid = recipes_recipe.id',
+            (terms,)
+        )).order_by('search_rank', '-id')
+    return queryset.filter(name__icontains=value)
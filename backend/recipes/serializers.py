@@ -1,18 +1,43 @@
+from collections import Counter
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
+from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework.exceptions import ValidationError
-from rest_framework.fields import (IntegerField, ReadOnlyField,
+from rest_framework.fields import (IntegerField, ListField, ReadOnlyField,
                                    SerializerMethodField)
-from rest_framework.relations import PrimaryKeyRelatedField
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import ModelSerializer, Serializer
 
+from core.thumbnails import ThumbnailsField, schedule_thumbnails
 from users.serializers import ModifiedUserSerializer
+from .cookable import ingredient_index
 from .models import (Ingredient, Recipe, RecipeIngredient, ShortLink, Tag)
+from .shopping_list import bump_shopping_lists_version
 
 User = get_user_model()
 
+RECIPE_THUMBNAILS = ('list', 'detail')
+
+
+def check_ids(model, ids, duplicate_message, missing_message):
+    """Проверяет список id одним запросом к базе и сообщает обо всех
+    повторяющихся и несуществующих id сразу."""
+    errors = []
+    duplicates = [pk for pk, count in Counter(ids).items() if count > 1]
+    if duplicates:
+        errors.append(
+            f'{duplicate_message}: {", ".join(map(str, duplicates))}'
+        )
+    found = set(model.objects.filter(
+        id__in=ids
+    ).values_list('id', flat=True))
+    missing = [pk for pk in dict.fromkeys(ids) if pk not in found]
+    if missing:
+        errors.append(f'{missing_message}: {", ".join(map(str, missing))}')
+    if errors:
+        raise ValidationError(errors)
+
 
 class TagSerializer(ModelSerializer):
     class Meta:
@@ -27,19 +52,14 @@ class IngredientSerializer(ModelSerializer):
 
 
 class IngredientInRecipeReadSerializer(ModelSerializer):
-    id = IntegerField()
-    name = ReadOnlyField()
-    measurement_unit = ReadOnlyField()
-    amount = SerializerMethodField(read_only=True)
+    id = ReadOnlyField(source='ingredient.id')
+    name = ReadOnlyField(source='ingredient.name')
+    measurement_unit = ReadOnlyField(source='ingredient.measurement_unit')
 
     class Meta:
-        model = Ingredient
+        model = RecipeIngredient
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
-    def get_amount(self, obj):
-        ingredient = obj.recipes_w_ingredient.first()
-        return f'{ingredient.amount}'
-
 
 class IngredientInRecipeWriteSerializer(ModelSerializer):
     id = IntegerField(write_only=True)
@@ -53,8 +73,17 @@ class IngredientInRecipeWriteSerializer(ModelSerializer):
         fields = ('id', 'amount')
 
 
+class RecipeIdsSerializer(Serializer):
+    recipes = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RECIPES_LIMIT
+    )
+
+
 class RecipeSubscribeSerializer(ModelSerializer):
     image = Base64ImageField()
+    thumbnails = ThumbnailsField(source='image', sizes=('list',))
 
     class Meta:
         model = Recipe
@@ -62,6 +91,7 @@ class RecipeSubscribeSerializer(ModelSerializer):
             'id',
             'name',
             'image',
+            'thumbnails',
             'cooking_time'
         )
 
@@ -69,8 +99,13 @@ class RecipeSubscribeSerializer(ModelSerializer):
 class RecipeReadSerializer(ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = ModifiedUserSerializer(read_only=True)
-    ingredients = IngredientInRecipeReadSerializer(many=True, read_only=True)
+    ingredients = IngredientInRecipeReadSerializer(
+        source='ingredients_in_resipe',
+        many=True,
+        read_only=True
+    )
     image = Base64ImageField()
+    thumbnails = ThumbnailsField(source='image', sizes=RECIPE_THUMBNAILS)
     is_favorited = SerializerMethodField(read_only=True)
     is_in_shopping_cart = SerializerMethodField(read_only=True)
 
@@ -85,28 +120,57 @@ class RecipeReadSerializer(ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'thumbnails',
             'text',
             'cooking_time',
         )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'favorited'):
+            return obj.favorited
         user = self.context['request'].user
         if user.is_anonymous:
             return False
         return user.favorites_recipes.filter(recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'in_shopping_cart'):
+            return obj.in_shopping_cart
         user = self.context['request'].user
         if user.is_anonymous:
             return False
         return user.shopping_cart_recipes.filter(recipe=obj).exists()
 
 
+class CookableRecipeSerializer(RecipeReadSerializer):
+    matched_count = SerializerMethodField(read_only=True)
+    missing_ingredients = SerializerMethodField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + (
+            'matched_count',
+            'missing_ingredients',
+        )
+
+    def get_missing(self, obj):
+        available = self.context['available_ingredients']
+        return [
+            item for item in obj.ingredients_in_resipe.all()
+            if item.ingredient_id not in available
+        ]
+
+    def get_matched_count(self, obj):
+        return (len(obj.ingredients_in_resipe.all())
+                - len(self.get_missing(obj)))
+
+    def get_missing_ingredients(self, obj):
+        return IngredientInRecipeReadSerializer(
+            self.get_missing(obj), many=True
+        ).data
+
+
 class RecipeWriteSerializer(ModelSerializer):
-    tags = PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
-    )
+    tags = ListField(child=IntegerField(min_value=1))
     author = ModifiedUserSerializer(read_only=True)
     ingredients = IngredientInRecipeWriteSerializer(many=True)
     image = Base64ImageField()
@@ -129,27 +193,21 @@ class RecipeWriteSerializer(ModelSerializer):
         )
 
     def validate_tags(self, value):
-        tags = value
-        if not tags:
+        if not value:
             raise ValidationError('Добавьте хотя бы один тег')
-        tags_set = {}
-        for item in tags:
-            tag = get_object_or_404(Tag, id=item['id'])
-            if tag in tags_set:
-                raise ValidationError('Теги не должны повторяться')
-            tags_set.add(tag)
+        check_ids(
+            Tag, value,
+            'Теги не должны повторяться', 'Теги не найдены'
+        )
         return value
 
     def validate_ingredients(self, value):
-        ingredients = value
-        if not ingredients:
+        if not value:
             raise ValidationError('Добавьте хотя бы один ингредиент')
-        ingredients_set = {}
-        for item in ingredients:
-            ingredient = get_object_or_404(Ingredient, id=item['id'])
-            if ingredient in ingredients_set:
-                raise ValidationError('Ингредиенты не должны повторяться')
-            ingredients_set.add(ingredient)
+        check_ids(
+            Ingredient, [item['id'] for item in value],
+            'Ингредиенты не должны повторяться', 'Ингредиенты не найдены'
+        )
         return value
 
     def validate_cooking_time(self, value):
@@ -170,27 +228,71 @@ class RecipeWriteSerializer(ModelSerializer):
             )
         return RecipeIngredient.objects.bulk_create(bulk_list)
 
+    def index_ingredients(self, recipe, ingredients):
+        # Индекс в памяти процесса обновляется только после фиксации,
+        # чтобы откат транзакции не оставил в нем несохраненные данные.
+        ingredient_ids = [ingredient['id'] for ingredient in ingredients]
+        transaction.on_commit(
+            lambda: ingredient_index.update(recipe.id, ingredient_ids)
+        )
+
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
+        schedule_thumbnails(recipe.image, RECIPE_THUMBNAILS)
         recipe.tags.set(tags)
         self.bulk_create_ingredients(ingredients, recipe)
+        self.index_ingredients(recipe, ingredients)
         return recipe
 
+    def update_ingredients(self, ingredients, recipe):
+        """Приводит ингредиенты рецепта к переданному списку, изменяя
+        только отличающиеся строки. Возвращает True, если что-то
+        изменилось."""
+        amounts = {item['id']: item['amount'] for item in ingredients}
+        existing = {
+            item.ingredient_id: item
+            for item in recipe.ingredients_in_resipe.all()
+        }
+        changed = []
+        for ingredient_id, item in existing.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and item.amount != amount:
+                item.amount = amount
+                changed.append(item)
+        RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        added = self.bulk_create_ingredients(
+            [item for item in ingredients if item['id'] not in existing],
+            recipe
+        )
+        removed = [
+            item.id for ingredient_id, item in existing.items()
+            if ingredient_id not in amounts
+        ]
+        if removed:
+            RecipeIngredient.objects.filter(id__in=removed).delete()
+        return bool(changed or added or removed)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        instance.ingredients.clear()
-        self.bulk_create_ingredients(ingredients, instance)
-        instance.tags.clear()
+        if self.update_ingredients(ingredients, instance):
+            bump_shopping_lists_version()
         instance.tags.set(tags)
-        return super().update(instance, validated_data)
+        instance = super().update(instance, validated_data)
+        if 'image' in validated_data:
+            schedule_thumbnails(instance.image, RECIPE_THUMBNAILS)
+        self.index_ingredients(instance, ingredients)
+        return instance
 
     def to_representation(self, instance):
+        request = self.context.get('request')
         return RecipeReadSerializer(
-            instance,
-            context={'request': self.context.get('request')}
+            Recipe.objects.for_read(request.user).get(pk=instance.pk),
+            context={'request': request}
         ).data
 
 
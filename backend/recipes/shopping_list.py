@@ -0,0 +1,181 @@
+import csv
+import io
+import os
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils.encoding import force_str
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer
+
+from .models import RecipeIngredient
+from .versions import bump_version, get_version
+
+CART_VERSION_KEY = 'shopping_cart_version:{user_id}'
+LISTS_VERSION_KEY = 'shopping_lists_version'
+LIST_CACHE_KEY = 'shopping_list:{user_id}:{cart}:{lists}:{day}:{format}'
+
+TITLE = 'Сегодня вам понадобятся:'
+FOOTER_ITEM = ('любовь', '1', 'горсточка ❤')
+SIGNATURE = '©Foodgram'
+
+
+def bump_cart_version(user_id):
+    """Сбрасывает кэш списков покупок пользователя."""
+    bump_version(CART_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_shopping_lists_version():
+    """Сбрасывает кэш списков покупок всех пользователей, например после
+    изменения состава рецептов или справочника ингредиентов."""
+    bump_version(LISTS_VERSION_KEY)
+
+
+def get_cache_key(user, export_format):
+    return LIST_CACHE_KEY.format(
+        user_id=user.id,
+        cart=get_version(CART_VERSION_KEY.format(user_id=user.id)),
+        lists=get_version(LISTS_VERSION_KEY),
+        day=date.today().isoformat(),
+        format=export_format,
+    )
+
+
+def get_ingredients(user):
+    return RecipeIngredient.objects.filter(
+        recipe__shopping_cart__user=user
+    ).values(
+        'ingredient__id',
+        'ingredient__name',
+        'ingredient__measurement_unit',
+    ).annotate(
+        amount=Sum('amount')
+    ).order_by('ingredient__name').iterator()
+
+
+def _rows(user):
+    for ingredient in get_ingredients(user):
+        yield (
+            ingredient['ingredient__name'],
+            str(ingredient['amount']),
+            ingredient['ingredient__measurement_unit'],
+        )
+    yield FOOTER_ITEM
+
+
+def render_txt(user):
+    yield f'{date.today():%d-%m-%Y}\n\n{TITLE}\n'
+    for name, amount, unit in _rows(user):
+        yield f'• {name} - {amount} {unit}\n'
+    yield f'\n\n\n{SIGNATURE}'
+
+
+class _Echo:
+
+    def write(self, value):
+        return value
+
+
+def render_csv(user):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(('Ингредиент', 'Количество', 'Единица измерения'))
+    for row in _rows(user):
+        yield writer.writerow(row)
+
+
+def render_pdf(user):
+    font = 'Helvetica'
+    if os.path.exists(settings.SHOPPING_LIST_PDF_FONT):
+        font = 'ShoppingListFont'
+        if font not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(
+                TTFont(font, settings.SHOPPING_LIST_PDF_FONT)
+            )
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    margin, line_height = 50, 18
+    y = height - margin
+
+    def draw(text, size=12):
+        nonlocal y
+        if y < margin:
+            pdf.showPage()
+            y = height - margin
+        pdf.setFont(font, size)
+        pdf.drawString(margin, y, text)
+        y -= line_height
+
+    draw(f'{date.today():%d-%m-%Y}')
+    draw(TITLE, size=14)
+    for name, amount, unit in _rows(user):
+        draw(f'• {name} - {amount} {unit}')
+    y -= line_height
+    draw(SIGNATURE, size=10)
+    pdf.save()
+    yield buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    'txt': (render_txt, 'text/plain; charset=utf-8'),
+    'csv': (render_csv, 'text/csv; charset=utf-8'),
+    'pdf': (render_pdf, 'application/pdf'),
+}
+
+
+def stream_shopping_list(user, export_format):
+    """Отдает список покупок по частям. Если список уже был построен для
+    текущей версии корзины, он берется из кэша, иначе сохраняется в кэш
+    после того, как будет полностью отдан."""
+    key = get_cache_key(user, export_format)
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+    render, _ = EXPORT_FORMATS[export_format]
+    chunks = []
+    for chunk in render(user):
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        chunks.append(chunk)
+        yield chunk
+    cache.set(key, b''.join(chunks), settings.SHOPPING_LIST_CACHE_TIMEOUT)
+
+
+def is_cached(user, export_format):
+    return get_cache_key(user, export_format) in cache
+
+
+class ExportRenderer(BaseRenderer):
+    """Позволяет запросить выгрузку с Accept: text/csv и т.п.
+    Формат списка задается параметром ?export=, сам список отдается
+    потоком, рендерер используется только для ответов с ошибками."""
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict) and 'detail' in data:
+            data = data['detail']
+        return force_str(data)
+
+
+class TxtRenderer(ExportRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PDFRenderer(ExportRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
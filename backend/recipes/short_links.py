@@ -0,0 +1,137 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Recipe, ShortLink
+
+CACHE_KEY = 'short_link:{code}'
+
+# Перемешивание id внутри блоков по 2**32: умножение на нечетное число
+# по модулю степени двойки обратимо, поэтому коды не повторяются.
+BLOCK = 2 ** 32
+INVERSE_MULTIPLIER = pow(settings.SHORT_LINK_MULTIPLIER, -1, BLOCK)
+
+
+def _permute(value, multiplier):
+    block, offset = divmod(value, BLOCK)
+    return block * BLOCK + offset * multiplier % BLOCK
+
+
+def encode(recipe_id):
+    """Короткий код рецепта: base62 от перемешанного id.
+
+    Код вычисляется без обращения к базе и однозначно соответствует id,
+    длина растет вместе с id, но не меньше SHORT_LINK_MIN_LEN символов.
+    """
+    alphabet = settings.SHORT_LINK_ALPHABET
+    value = _permute(recipe_id, settings.SHORT_LINK_MULTIPLIER)
+    chars = []
+    while value:
+        value, index = divmod(value, len(alphabet))
+        chars.append(alphabet[index])
+    chars.extend(alphabet[0] * (settings.SHORT_LINK_MIN_LEN - len(chars)))
+    return ''.join(reversed(chars))
+
+
+def decode(code):
+    """Обратное преобразование encode. Возвращает None для строк, которые
+    не могли быть выданы encode."""
+    alphabet = settings.SHORT_LINK_ALPHABET
+    if len(code) < settings.SHORT_LINK_MIN_LEN:
+        return None
+    value = 0
+    for char in code:
+        index = alphabet.find(char)
+        if index < 0:
+            return None
+        value = value * len(alphabet) + index
+    recipe_id = _permute(value, INVERSE_MULTIPLIER)
+    if not recipe_id or encode(recipe_id) != code:
+        return None
+    return recipe_id
+
+
+class LRUCache:
+    """Ограниченный по размеру словарь, вытесняющий давно не
+    использованные ключи. Значения живут не дольше timeout секунд."""
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            value, expires = self._data[key]
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+# forget() очищает LRU только в своем процессе, в остальных воркерах
+# удаленный рецепт перестает находиться через SHORT_LINK_LRU_TIMEOUT.
+resolved_links = LRUCache(
+    settings.SHORT_LINK_LRU_SIZE, settings.SHORT_LINK_LRU_TIMEOUT
+)
+
+
+def _cache_key(code):
+    # Код приходит из URL как есть, а ключи memcached не допускают
+    # пробелов, управляющих символов и длины больше 250.
+    return CACHE_KEY.format(code=hashlib.md5(code.encode()).hexdigest())
+
+
+def _resolve_from_db(code):
+    recipe_id = decode(code)
+    if recipe_id is None:
+        return ShortLink.objects.filter(
+            short_link=code
+        ).values_list('recipe_id', flat=True).first()
+    if Recipe.objects.filter(id=recipe_id).exists():
+        return recipe_id
+    return None
+
+
+def resolve(code):
+    """id рецепта по короткому коду или None.
+
+    Найденные коды запоминаются в LRU процесса и в общем кэше,
+    отсутствующие не кэшируются: рецепт с таким id может появиться позже.
+    """
+    recipe_id = resolved_links.get(code)
+    if recipe_id is not None:
+        return recipe_id
+    key = _cache_key(code)
+    recipe_id = cache.get(key)
+    if recipe_id is None:
+        recipe_id = _resolve_from_db(code)
+        if recipe_id is None:
+            return None
+        cache.set(key, recipe_id, settings.SHORT_LINK_CACHE_TIMEOUT)
+    resolved_links.set(code, recipe_id)
+    return recipe_id
+
+
+def forget(code):
+    cache.delete(_cache_key(code))
+    resolved_links.delete(code)
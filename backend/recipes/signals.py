@@ -0,0 +1,60 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import ingredient_catalog, tag_catalog
+from .cookable import ingredient_index
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, ShortLink, Tag)
+from .shopping_list import bump_cart_version, bump_shopping_lists_version
+from .short_links import encode, forget
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag_catalog(sender, **kwargs):
+    tag_catalog.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_catalog(sender, **kwargs):
+    ingredient_catalog.invalidate()
+    bump_shopping_lists_version()
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def invalidate_shopping_list(sender, instance, **kwargs):
+    bump_cart_version(instance.user_id)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def invalidate_shopping_lists(sender, **kwargs):
+    bump_shopping_lists_version()
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_recipe_short_link(sender, instance, **kwargs):
+    forget(encode(instance.pk))
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_deleted_recipe(sender, instance, **kwargs):
+    recipe_id = instance.pk
+    transaction.on_commit(lambda: ingredient_index.remove(recipe_id))
+
+
+@receiver(post_delete, sender=ShortLink)
+def forget_legacy_short_link(sender, instance, **kwargs):
+    forget(instance.short_link)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    # Уменьшают счетчики только вьюхи, по строкам, которые вернул
+    # DELETE ... RETURNING: post_delete приходит и для строк, уже
+    # удаленных параллельным запросом. После удаления в админке или
+    # каскадом счетчики пересчитывает reconcile_recipe_counters.
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).change_counter(
+            sender.counter_field, 1
+        )
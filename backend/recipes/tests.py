@@ -0,0 +1,403 @@
+import json
+from datetime import date, datetime, timezone
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.middleware import QueryBudgetExceeded
+from core.querysets import InsertIgnoreQuerySet
+from core.renderers import ORJSONRenderer
+from users.models import Subscribe
+from . import views
+from .catalog import CatalogCache
+from .fast_read import RecipeFastReadSerializer
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, Tag)
+from .serializers import RecipeReadSerializer, TagSerializer
+from .trending import refresh_trending
+
+User = get_user_model()
+
+
+class RecipeIngredientsReadTest(TestCase):
+    """Ингредиенты рецепта читаются из предзагруженных строк
+    RecipeIngredient: число запросов не зависит от числа ингредиентов,
+    а количество берется из сериализуемого рецепта."""
+
+    INGREDIENTS = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Иван', last_name='Иванов', password='password'
+        )
+        tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {index:02}', measurement_unit='г'
+            )
+            for index in range(cls.INGREDIENTS)
+        ]
+        cls.recipes = []
+        for number in range(1, 3):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Описание',
+                cooking_time=10, image='recipes/images/recipe.png'
+            )
+            recipe.tags.add(tag)
+            # Одни и те же ингредиенты с разным количеством в рецептах.
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient,
+                    amount=number * 100 + index
+                )
+                for index, ingredient in enumerate(ingredients)
+            )
+            cls.recipes.append(recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def assertAmounts(self, data):
+        number = int(data['name'].split()[-1])
+        self.assertEqual(len(data['ingredients']), self.INGREDIENTS)
+        for index, ingredient in enumerate(data['ingredients']):
+            self.assertEqual(ingredient['name'], f'Ингредиент {index:02}')
+            self.assertEqual(ingredient['amount'], number * 100 + index)
+
+    def test_detail(self):
+        # Рецепт, теги, ингредиенты, автор.
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                f'/api/recipes/{self.recipes[0].id}/'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertAmounts(response.json())
+
+    def test_list(self):
+        # COUNT(*), страница, теги, ингредиенты, авторы.
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/recipes/', {'limit': 10})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), len(self.recipes))
+        for data in results:
+            self.assertAmounts(data)
+
+    def test_serializer(self):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = self.recipes[0].author
+        with self.assertNumQueries(4):
+            data = RecipeReadSerializer(
+                Recipe.objects.for_read(request.user), many=True,
+                context={'request': request}
+            ).data
+        for recipe in data:
+            self.assertAmounts(recipe)
+
+
+class RecipeFastReadTest(TestCase):
+    """RecipeFastReadSerializer + ORJSONRenderer выдают те же байты, что
+    RecipeReadSerializer + JSONRenderer."""
+
+    # Кавычки, обратная косая черта, управляющие символы, разделители
+    # строк U+2028/U+2029 (JSONRenderer их экранирует), не-ASCII и эмодзи.
+    TEXT = (
+        'Кавычки "двойные", \\обратная черта\\, </script>\n\t'
+        + ''.join(chr(code) for code in range(1, 32))
+        + '\x7f \u2028 \u2029 ёжик 😀 \u00a0'
+    )
+    URLS = (
+        '/api/recipes/',
+        '/api/recipes/?limit=2&page=2',
+        '/api/recipes/?limit=2&cursor=',
+        '/api/recipes/?is_favorited=1',
+        '/api/recipes/feed/',
+        '/api/recipes/trending/',
+        '/api/recipes/99999/',
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Анна', last_name='О\'Нил "Мл."', password='password'
+        )
+        cls.author.avatar = 'users/images/avatar.png'
+        cls.author.save()
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            first_name='Пётр', last_name='😀', password='password'
+        )
+        tags = [
+            Tag.objects.create(name='Ужин "поздний"', slug='dinner'),
+            Tag.objects.create(name='Без слага', slug=None),
+        ]
+        ingredient = Ingredient.objects.create(
+            name='соль "морская" \\ крупная', measurement_unit='г'
+        )
+        recipes = [
+            Recipe.objects.create(
+                author=cls.author, name=name, text=text, cooking_time=time,
+                image='recipes/images/recipe.png'
+            )
+            for name, text, time in (
+                ('Ёжик  ', cls.TEXT, 1),
+                ('Плов', 'Простое описание', 32000),
+                ('Без тегов и ингредиентов', '', 5),
+            )
+        ]
+        for recipe in recipes[:2]:
+            recipe.tags.set(tags)
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=32000
+            )
+        Favorite.objects.create(user=cls.reader, recipe=recipes[0])
+        ShoppingCart.objects.create(user=cls.reader, recipe=recipes[1])
+        Subscribe.objects.create(user=cls.reader, author=cls.author)
+
+    def users(self):
+        return (AnonymousUser(), self.author, self.reader)
+
+    def test_serializer_output_matches(self):
+        for user in self.users():
+            request = Request(APIRequestFactory().get('/api/recipes/'))
+            request.user = user
+            context = {'request': request}
+            recipes = list(Recipe.objects.for_read(user))
+            with self.subTest(user=user):
+                self.assertEqual(
+                    ORJSONRenderer().render(RecipeFastReadSerializer(
+                        recipes, many=True, context=context
+                    ).data),
+                    JSONRenderer().render(RecipeReadSerializer(
+                        recipes, many=True, context=context
+                    ).data),
+                )
+
+    def test_renderer_output_matches(self):
+        data = {
+            'created': datetime(2024, 1, 2, 3, 4, 5, 678, tzinfo=timezone.utc),
+            'day': date(2024, 1, 2),
+            1: 'ключ-число',
+            'big': 2 ** 70,
+            'text': self.TEXT,
+        }
+        self.assertEqual(
+            ORJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+        del data['big']
+        self.assertEqual(
+            ORJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def get_responses(self, user):
+        client = APIClient()
+        if user.is_authenticated:
+            client.force_authenticate(user)
+        urls = self.URLS + tuple(
+            f'/api/recipes/{recipe_id}/'
+            for recipe_id in Recipe.objects.values_list('id', flat=True)
+        )
+        return [
+            (url, response.status_code, response.content)
+            for url, response in (
+                (url, client.get(url)) for url in urls
+            )
+        ]
+
+    def test_api_output_matches(self):
+        for user in self.users():
+            fast = self.get_responses(user)
+            with mock.patch.object(
+                views.RecipeViewSet, 'renderer_classes', (JSONRenderer,)
+            ), mock.patch.object(
+                views, 'RecipeFastReadSerializer', RecipeReadSerializer
+            ):
+                expected = self.get_responses(user)
+            for actual, slow in zip(fast, expected):
+                with self.subTest(user=user, url=actual[0]):
+                    self.assertEqual(actual, slow)
+
+
+class RecipeCounterTest(TestCase):
+    """Счетчики избранного и корзины уменьшаются только за строки,
+    которые удалил сам запрос."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, other = (
+            User.objects.create_user(
+                username=name, email=f'{name}@example.com',
+                first_name=name, last_name=name, password='password'
+            )
+            for name in ('user', 'other')
+        )
+        cls.recipe = Recipe.objects.create(
+            author=other, name='Рецепт', text='Описание', cooking_time=10,
+            image='recipes/images/recipe.png'
+        )
+        for user in (cls.user, other):
+            ShoppingCart.objects.create(user=user, recipe=cls.recipe)
+
+    def test_overlapping_deletes(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = f'/api/recipes/{self.recipe.id}/shopping_cart/'
+        delete_returning = InsertIgnoreQuerySet.delete_returning
+        statuses = []
+        overlapped = []
+
+        def delete_after_concurrent_request(queryset, field_name):
+            # Второй запрос успевает удалить ту же строку раньше.
+            if not overlapped:
+                overlapped.append(True)
+                statuses.append(client.delete(url).status_code)
+            return delete_returning(queryset, field_name)
+
+        with mock.patch.object(
+            InsertIgnoreQuerySet, 'delete_returning',
+            delete_after_concurrent_request
+        ):
+            statuses.append(client.delete(url).status_code)
+        self.assertEqual(statuses, [204, 404])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.in_carts_count, 1)
+        self.assertEqual(
+            ShoppingCart.objects.filter(recipe=self.recipe).count(), 1
+        )
+
+
+class ShoppingListDownloadTest(TestCase):
+    """Формат выгрузки задается параметром ?export=, ?format= остается
+    за DRF."""
+
+    URL = '/api/recipes/download_shopping_cart/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com',
+            first_name='user', last_name='user', password='password'
+        )
+        recipe = Recipe.objects.create(
+            author=cls.user, name='Рецепт', text='Описание', cooking_time=10,
+            image='recipes/images/recipe.png'
+        )
+        RecipeIngredient.objects.create(
+            recipe=recipe, amount=5, ingredient=Ingredient.objects.create(
+                name='Соль', measurement_unit='г'
+            )
+        )
+        ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_export_formats(self):
+        for export_format, content_type in (
+            ('txt', 'text/plain; charset=utf-8'),
+            ('csv', 'text/csv; charset=utf-8'),
+            ('pdf', 'application/pdf'),
+        ):
+            with self.subTest(export_format=export_format):
+                response = self.client.get(self.URL, {'export': export_format})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Type'], content_type)
+                self.assertTrue(b''.join(response.streaming_content))
+
+    def test_unknown_export_format(self):
+        response = self.client.get(self.URL, {'export': 'xml'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), 'Неизвестный формат xml')
+
+
+@override_settings(QUERY_PROFILING=True, QUERY_BUDGET_STRICT=True)
+class RecipeQueryBudgetTest(TestCase):
+    """Горячие эндпоинты рецептов укладываются в свои query_budgets."""
+
+    URLS = (
+        '/api/recipes/',
+        '/api/recipes/{recipe_id}/',
+        '/api/recipes/feed/',
+        '/api/recipes/cookable/?ingredients={ingredient_id}',
+        '/api/recipes/trending/',
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        author, cls.reader = (
+            User.objects.create_user(
+                username=name, email=f'{name}@example.com',
+                first_name=name, last_name=name, password='password'
+            )
+            for name in ('author', 'reader')
+        )
+        tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        cls.ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+        for number in range(3):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Описание',
+                cooking_time=10, image='recipes/images/recipe.png'
+            )
+            recipe.tags.add(tag)
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=cls.ingredient, amount=5
+            )
+            Favorite.objects.create(user=cls.reader, recipe=recipe)
+        cls.recipe = recipe
+        Subscribe.objects.create(user=cls.reader, author=author)
+        refresh_trending()
+
+    def setUp(self):
+        # Middleware собирается при первом запросе клиента, уже с
+        # настройками теста.
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def get(self, url):
+        return self.client.get(url.format(
+            recipe_id=self.recipe.id, ingredient_id=self.ingredient.id
+        ))
+
+    def test_within_budget(self):
+        for url in self.URLS:
+            with self.subTest(url=url), self.assertLogs(
+                'foodgram.queries', 'INFO'
+            ) as logs:
+                self.assertEqual(self.get(url).status_code, 200)
+                record = json.loads(logs.records[-1].getMessage())
+                self.assertIsNotNone(record['budget'])
+                self.assertLessEqual(record['queries'], record['budget'])
+
+    def test_over_budget(self):
+        with mock.patch.object(
+            views.RecipeViewSet, 'query_budgets', {'list': 1}
+        ), self.assertLogs('foodgram.queries', 'WARNING'):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.get('/api/recipes/')
+
+
+class CatalogCacheTest(TestCase):
+    """Изменение справочника сбрасывает его кэш во всех воркерах."""
+
+    def test_invalidation_reaches_other_workers(self):
+        # Два экземпляра кэша - как в двух процессах gunicorn.
+        worker, other_worker = (
+            CatalogCache(Tag, TagSerializer) for _ in range(2)
+        )
+        etag = other_worker.get().etag
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Ужин', slug='dinner')
+        self.assertIn('Ужин'.encode(), other_worker.get().content)
+        self.assertNotEqual(other_worker.get().etag, etag)
+        self.assertEqual(worker.get().etag, other_worker.get().etag)
@@ -0,0 +1,133 @@
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Favorite, Recipe, ShoppingCart, TrendingRecipe
+
+# Вес добавления в корзину относительно добавления в избранное.
+EVENT_WEIGHTS = (
+    (Favorite, 1.0),
+    (ShoppingCart, 0.5),
+)
+
+# Ключ advisory-блокировки PostgreSQL, под которой пересчитывается
+# таблица популярных рецептов.
+TRENDING_LOCK_KEY = 0x74726e64
+
+
+def compute_scores(now=None):
+    """Рейтинг рецептов по добавлениям в избранное и корзину за последние
+    TRENDING_WINDOW_DAYS дней. Вклад добавления убывает вдвое каждые
+    TRENDING_HALF_LIFE_DAYS дней.
+
+    События агрегируются в базе по дням, поэтому в Python приходит
+    не больше (рецептов x дней) строк независимо от числа событий.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+    today = timezone.localdate(now)
+    scores = defaultdict(float)
+    for model, weight in EVENT_WEIGHTS:
+        rows = model.objects.filter(created__gte=since).annotate(
+            day=TruncDate('created')
+        ).order_by().values('recipe_id', 'day').annotate(events=Count('id'))
+        for row in rows.iterator():
+            age = (today - row['day']).days
+            decay = math.pow(0.5, age / settings.TRENDING_HALF_LIFE_DAYS)
+            scores[row['recipe_id']] += weight * row['events'] * decay
+    return scores
+
+
+def lock_trending():
+    """Берет блокировку пересчета до конца транзакции."""
+    if connection.vendor != 'postgresql':
+        # SQLite и так выполняет пишущие транзакции по одной.
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', [TRENDING_LOCK_KEY])
+
+
+def refresh_trending():
+    """Пересчитывает таблицу популярных рецептов.
+
+    Вызывается командой refresh_trending, а не из запросов к API.
+    Одновременные пересчеты выполняются по очереди (иначе второй
+    вставил бы строки поверх первого и нарушил уникальность recipe).
+    """
+    now = timezone.now()
+    scores = compute_scores(now)
+    top = sorted(
+        scores.items(), key=lambda item: (-item[1], -item[0])
+    )[:settings.TRENDING_SIZE]
+    with transaction.atomic():
+        lock_trending()
+        TrendingRecipe.objects.all().delete()
+        TrendingRecipe.objects.bulk_create(
+            TrendingRecipe(recipe_id=recipe_id, score=score, refreshed=now)
+            for recipe_id, score in top
+        )
+    ranking.invalidate()
+    return len(top)
+
+
+class TrendingRanking:
+    """Рейтинг из TrendingRecipe, закэшированный в памяти процесса.
+
+    Хранит упорядоченные id рецептов и слаги их тегов, чтобы фильтровать
+    по тегам без обращения к базе. Таблицу пересчитывает команда
+    refresh_trending, воркеры перечитывают ее по истечении
+    TRENDING_CACHE_TIMEOUT.
+    """
+
+    def __init__(self):
+        self._entries = None
+        self._loaded = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._entries = None
+
+    def get(self):
+        entries = self._entries
+        if entries is None or not self._is_fresh():
+            with self._lock:
+                # Пока ждали блокировку, рейтинг мог загрузить другой поток.
+                entries = self._entries
+                if entries is None or not self._is_fresh():
+                    entries = self._entries = self._load()
+                    self._loaded = time.monotonic()
+        return entries
+
+    def _is_fresh(self):
+        return (time.monotonic() - self._loaded
+                < settings.TRENDING_CACHE_TIMEOUT)
+
+    def recipe_ids(self, tags=None, limit=None):
+        tags = set(tags or ())
+        ids = [
+            recipe_id for recipe_id, recipe_tags in self.get()
+            if not tags or tags & recipe_tags
+        ]
+        return ids[:limit]
+
+    def _load(self):
+        recipe_ids = list(
+            TrendingRecipe.objects.values_list('recipe_id', flat=True)
+        )
+        tags = defaultdict(set)
+        for recipe_id, slug in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'tag__slug'):
+            tags[recipe_id].add(slug)
+        return [(recipe_id, tags[recipe_id]) for recipe_id in recipe_ids]
+
+
+ranking = TrendingRanking()
@@ -1,8 +1,8 @@
-from django.urls import include, path, re_path
+from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (IngredientViewSet, RecipeViewSet, ShortLinkViewSet,
-                    TagViewSet)
+                    TagViewSet, short_link_redirect)
 
 app_name = 'recipes'
 
@@ -15,6 +15,8 @@ router.register('recipes', ShortLinkViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
-    re_path(r'^(?P<short_url>\w{3})/$',
-            RecipeViewSet.as_view({'get': 'short_link'})),
+]
+
+short_link_urlpatterns = [
+    path('<str:short_url>/', short_link_redirect),
 ]
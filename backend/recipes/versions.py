@@ -0,0 +1,21 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def get_version(key):
+    """Текущая версия из общего кэша: одна на все воркеры."""
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    # Версия меняется после фиксации транзакции: иначе запрос между
+    # сменой версии и фиксацией закэшировал бы старые данные под новой
+    # версией.
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, None))
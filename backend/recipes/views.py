@@ -1,36 +1,48 @@
-import random
-import string
-from datetime import datetime
-
 from django.conf import settings
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
 from core.filters import IngredientFilter, RecipeFilter
-from core.pagination import ModifiedPagination
+from core.pagination import IdCursorPagination, ModifiedPagination
 from core.permissions import IsAdminOrReadOnly, IsAuthorOrReadOnly
-from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, ShortLink, Tag)
-from .serializers import (IngredientSerializer, RecipeReadSerializer,
-                          RecipeSubscribeSerializer, RecipeWriteSerializer,
-                          ShortLinkSerializer, TagSerializer)
+from core.renderers import ORJSONRenderer
+from users.models import Subscribe
+from .catalog import CatalogListMixin, ingredient_catalog, tag_catalog
+from .cookable import ingredient_index
+from .fast_read import RecipeFastReadSerializer
+from .models import (Favorite, Ingredient, Recipe, ShoppingCart, ShortLink,
+                     Tag)
+from .serializers import (CookableRecipeSerializer, IngredientSerializer,
+                          RecipeIdsSerializer, RecipeSubscribeSerializer,
+                          RecipeWriteSerializer, ShortLinkSerializer,
+                          TagSerializer)
+from .shopping_list import (EXPORT_FORMATS, CSVRenderer, PDFRenderer,
+                            TxtRenderer, bump_cart_version, is_cached,
+                            stream_shopping_list)
+from .short_links import encode, resolve
+from .trending import ranking
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(CatalogListMixin, ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    catalog_cache = tag_catalog
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogListMixin, ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    catalog_cache = ingredient_catalog
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
@@ -41,32 +53,123 @@ class RecipeViewSet(ModelViewSet):
     pagination_class = ModifiedPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    renderer_classes = (ORJSONRenderer, BrowsableAPIRenderer)
+    query_budgets = {
+        'list': 6,
+        'retrieve': 5,
+        'feed': 6,
+        'cookable': 6,
+        # С загрузкой рейтинга в память процесса.
+        'trending': 7,
+    }
+
+    def get_queryset(self):
+        if self.request.method in SAFE_METHODS:
+            return Recipe.objects.for_read(self.request.user)
+        return super().get_queryset()
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
-            return RecipeReadSerializer
+            return RecipeFastReadSerializer
         return RecipeWriteSerializer
 
     def add_resipe(self, model, user, pk, location_name):
-        if model.objects.filter(user=user, recipe__id=pk).exists():
+        recipe = get_object_or_404(Recipe, id=pk)
+        if model.objects.insert_ignore(user=user, recipe=recipe) is None:
             return Response(f'Рецепт уже есть в {location_name}',
                             status=status.HTTP_400_BAD_REQUEST)
-        recipe = get_object_or_404(Recipe, id=pk)
-        model.objects.create(user=user, recipe=recipe)
         serializer = RecipeSubscribeSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def remove_recipes(self, model, user, recipe_ids):
+        """Удаляет рецепты recipe_ids из избранного или корзины user и
+        возвращает id действительно удаленных.
+
+        Один DELETE ... RETURNING: счетчики уменьшаются только для строк,
+        удаленных этим запросом, даже если тот же рецепт одновременно
+        удаляет другой запрос (и без UPDATE на каждую строку).
+        """
+        with transaction.atomic():
+            removed = set(model.objects.filter(
+                user=user, recipe_id__in=recipe_ids
+            ).delete_returning('recipe_id'))
+            Recipe.objects.filter(id__in=removed).change_counter(
+                model.counter_field, -1
+            )
+        if model is ShoppingCart and removed:
+            bump_cart_version(user.id)
+        return removed
+
     def delete_resipe(self, model, user, pk, location_name):
-        obj = model.objects.filter(user=user, recipe__id=pk)
-        if obj.exists():
-            obj.delete()
+        if self.remove_recipes(model, user, [pk]):
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(f'Рецепта нет в {location_name}',
                         status=status.HTTP_404_NOT_FOUND)
 
+    def bulk_add_recipes(self, model, user, recipe_ids):
+        found = set(Recipe.objects.filter(
+            id__in=recipe_ids
+        ).values_list('id', flat=True))
+        # Добавленными считаются только строки, вставленные этим запросом:
+        # одновременный запрос мог добавить часть рецептов раньше.
+        with transaction.atomic():
+            added = set(model.objects.bulk_insert_ignore(
+                [model(user=user, recipe_id=pk) for pk in found],
+                'recipe_id'
+            ))
+            Recipe.objects.filter(id__in=added).change_counter(
+                model.counter_field, 1
+            )
+        if model is ShoppingCart and added:
+            bump_cart_version(user.id)
+        results = []
+        for pk in recipe_ids:
+            if pk not in found:
+                result = 'not_found'
+            elif pk in added:
+                result = 'added'
+            else:
+                result = 'already_added'
+            results.append({'id': pk, 'status': result})
+        return Response(results)
+
+    def bulk_delete_recipes(self, model, user, recipe_ids):
+        existing = self.remove_recipes(model, user, recipe_ids)
+        return Response([
+            {'id': pk,
+             'status': 'deleted' if pk in existing else 'not_found'}
+            for pk in recipe_ids
+        ])
+
+    def bulk_change_recipes(self, request, model):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+        if request.method == 'POST':
+            return self.bulk_add_recipes(model, request.user, recipe_ids)
+        return self.bulk_delete_recipes(model, request.user, recipe_ids)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='favorite'
+    )
+    def bulk_favorite(self, request):
+        return self.bulk_change_recipes(request, Favorite)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart'
+    )
+    def bulk_shopping_cart(self, request):
+        return self.bulk_change_recipes(request, ShoppingCart)
+
     @action(
         detail=True,
         methods=['post', 'delete'],
@@ -93,50 +196,105 @@ class RecipeViewSet(ModelViewSet):
         return self.delete_resipe(ShoppingCart, request.user,
                                   pk, location_name)
 
+    @action(
+        detail=False
+    )
+    def trending(self, request):
+        limit = request.query_params.get('limit', '')
+        recipe_ids = ranking.recipe_ids(
+            tags=request.query_params.getlist('tags'),
+            limit=int(limit) if limit.isdigit() else settings.TRENDING_SIZE
+        )
+        recipes = Recipe.objects.for_read(request.user).in_bulk(recipe_ids)
+        serializer = RecipeFastReadSerializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes],
+            many=True,
+            context={'request': request}
+        )
+        return Response(serializer.data)
+
+    @action(
+        detail=False
+    )
+    def cookable(self, request):
+        available = {
+            int(pk) for pk in request.query_params.getlist('ingredients')
+            if pk.isdigit()
+        }
+        if not available:
+            return Response('Укажите имеющиеся ингредиенты',
+                            status=status.HTTP_400_BAD_REQUEST)
+        limit = request.query_params.get('limit', '')
+        recipe_ids = ingredient_index.match(
+            available,
+            limit=int(limit) if limit.isdigit() else settings.COOKABLE_SIZE
+        )
+        recipes = Recipe.objects.for_read(request.user).in_bulk(recipe_ids)
+        serializer = CookableRecipeSerializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes],
+            many=True,
+            context={'request': request, 'available_ingredients': available}
+        )
+        return Response(serializer.data)
+
     @action(
         detail=False,
         permission_classes=[IsAuthenticated]
     )
-    def download_shopping_cart(self, request):
+    def feed(self, request):
         user = request.user
-        if not user.shopping_cart_recipes.exists():
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-        ingredients_list = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount'))
-        today = datetime.today()
-        shopping_list = (
-            f'{today:%d-%m-%Y}\n\n'
-            'Сегодня вам понадобятся:\n'
+        queryset = self.filter_queryset(
+            Recipe.objects.for_read(user).filter(
+                author__in=Subscribe.objects.filter(
+                    user=user
+                ).values('author')
+            )
         )
-        shopping_list += '\n'.join([
-            f'• {ingredient["ingredient__name"]} '
-            f'- {ingredient["amount"]} '
-            f'{ingredient["ingredient__measurement_unit"]}'
-            for ingredient in ingredients_list
-        ])
-        shopping_list += (
-            '\n• любовь - 1 горсточка ❤'
-            '\n\n\n\n©Foodgram'
+        paginator = IdCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = RecipeFastReadSerializer(
+            page, many=True, context={'request': request}
         )
+        return paginator.get_paginated_response(serializer.data)
 
-        filename = f'{user.username}_shopping_list.txt'
-        response = HttpResponse(shopping_list, content_type='text/plain')
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        renderer_classes=(JSONRenderer, TxtRenderer, CSVRenderer,
+                          PDFRenderer)
+    )
+    def download_shopping_cart(self, request):
+        user = request.user
+        # ?format= занят DRF под выбор рендерера (URL_FORMAT_OVERRIDE).
+        export_format = request.query_params.get('export', 'txt')
+        if export_format not in EXPORT_FORMATS:
+            return Response(f'Неизвестный формат {export_format}',
+                            status=status.HTTP_400_BAD_REQUEST)
+        if (not is_cached(user, export_format)
+                and not user.shopping_cart_recipes.exists()):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        _, content_type = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            stream_shopping_list(user, export_format),
+            content_type=content_type
+        )
+        filename = f'{user.username}_shopping_list.{export_format}'
         response['Content-Disposition'] = f'attachment; filename={filename}'
-
         return response
 
-    @action(
-        detail=True
+
+@require_GET
+def short_link_redirect(request, short_url):
+    """Редирект с короткой ссылки на страницу рецепта в обход DRF."""
+    recipe_id = resolve(short_url)
+    if recipe_id is None:
+        raise Http404
+    response = redirect(f'{request.scheme}://{request.get_host()}'
+                        f'/recipes/{recipe_id}')
+    patch_cache_control(
+        response, public=True, max_age=settings.SHORT_LINK_CACHE_TIMEOUT
     )
-    def short_link(self, request, short_url):
-        recipe = get_object_or_404(ShortLink, short_link=short_url)
-        full_link = (f'{self.request.scheme}://{self.request.get_host()}'
-                     f'/recipes/{str(recipe.recipe_id)}')
-        return redirect(full_link)
+    return response
 
 
 class ShortLinkViewSet(ModelViewSet):
@@ -148,14 +306,7 @@ class ShortLinkViewSet(ModelViewSet):
         url_path='get-link'
     )
     def short_link(self, request, pk):
-        if not ShortLink.objects.filter(recipe__id=pk).exists():
-            short_link = ''.join(random.choice(
-                string.ascii_lowercase + string.digits)
-                for _ in range(settings.SHORT_LINK_LEN)
-            )
-            recipe = get_object_or_404(Recipe, id=pk)
-            ShortLink.objects.create(recipe=recipe, short_link=short_link)
-        short_link_obj = get_object_or_404(ShortLink, recipe_id=pk)
+        recipe = get_object_or_404(Recipe.objects.only('id'), id=pk)
         base_link = f'{self.request.scheme}://{self.request.get_host()}/s/'
-        short_link = str(base_link + short_link_obj.short_link)
+        short_link = str(base_link + encode(recipe.id))
         return Response({'short-link': short_link})
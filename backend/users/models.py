@@ -1,5 +1,28 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import Count, Exists, OuterRef
+
+from core.querysets import InsertIgnoreQuerySet
+
+
+class UserQuerySet(models.QuerySet):
+
+    def with_subscription(self, user):
+        """Аннотирует пользователей флагом подписки на них user."""
+        if user.is_anonymous:
+            return self.annotate(
+                is_subscribed=models.Value(False, models.BooleanField())
+            )
+        return self.annotate(is_subscribed=Exists(
+            Subscribe.objects.filter(user=user, author=OuterRef('pk'))
+        ))
+
+    def with_recipes_count(self):
+        return self.annotate(recipes_count=Count('authored_recipes'))
+
+
+class ModifiedUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
 
 
 class User(AbstractUser):
@@ -30,6 +53,8 @@ class User(AbstractUser):
         verbose_name='Аватар'
     )
 
+    objects = ModifiedUserManager()
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
@@ -57,6 +82,8 @@ class Subscribe(models.Model):
         on_delete=models.CASCADE,
     )
 
+    objects = InsertIgnoreQuerySet.as_manager()
+
     class Meta:
         ordering = ['-id']
         constraints = [
@@ -6,12 +6,20 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.fields import SerializerMethodField
 from rest_framework.serializers import ModelSerializer
 
+from core.thumbnails import ThumbnailsField, schedule_thumbnails
 from .models import Subscribe
 
 
 User = get_user_model()
 
 
+def get_recipes_limit(request):
+    limit = request.query_params.get('recipes_limit')
+    if limit and limit.isdigit():
+        return int(limit)
+    return None
+
+
 class AvatarSerializer(ModelSerializer):
     avatar = Base64ImageField()
 
@@ -19,9 +27,15 @@ class AvatarSerializer(ModelSerializer):
         model = User
         fields = ('avatar',)
 
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        schedule_thumbnails(instance.avatar, ('avatar',))
+        return instance
+
 
 class ModifiedUserSerializer(UserSerializer):
     is_subscribed = SerializerMethodField(read_only=True)
+    avatar_thumbnails = ThumbnailsField(source='avatar', sizes=('avatar',))
 
     class Meta:
         model = User
@@ -32,10 +46,13 @@ class ModifiedUserSerializer(UserSerializer):
             'first_name',
             'last_name',
             'is_subscribed',
-            'avatar'
+            'avatar',
+            'avatar_thumbnails'
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         if user.is_anonymous:
             return False
@@ -72,15 +89,18 @@ class SubscribeSerializer(ModifiedUserSerializer):
 
     def get_recipes(self, obj):
         from recipes.serializers import RecipeSubscribeSerializer
-        request = self.context['request']
-        limit = request.GET['recipes_limit']
-        recipes = obj.authored_recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
+        recipes = getattr(obj, 'latest_recipes', None)
+        if recipes is None:
+            recipes = obj.authored_recipes.all()
+            limit = get_recipes_limit(self.context['request'])
+            if limit is not None:
+                recipes = recipes[:limit]
         serializer = RecipeSubscribeSerializer(recipes, many=True)
         return serializer.data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return obj.authored_recipes.count()
 
 
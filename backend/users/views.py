@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from djoser.serializers import SetPasswordSerializer
 from djoser.views import UserViewSet
@@ -9,10 +10,11 @@ from rest_framework.response import Response
 
 from core.pagination import ModifiedPagination
 from core.permissions import IsAdminOrReadOnly, IsUserOrReadOnly
+from recipes.models import Recipe
 from .models import Subscribe
 from .serializers import (AvatarSerializer, ModifiedUserCreateSerializer,
                           ModifiedUserSerializer, SubscribeSerializer,
-                          SubscribeWriteSerializer)
+                          SubscribeWriteSerializer, get_recipes_limit)
 
 
 User = get_user_model()
@@ -22,6 +24,25 @@ class ModifiedUserViewSet(UserViewSet):
     queryset = User.objects.all()
     permission_classes = (IsUserOrReadOnly | IsAdminOrReadOnly,)
     pagination_class = ModifiedPagination
+    query_budgets = {
+        'list': 3,
+        'retrieve': 2,
+        'me': 2,
+        'subscriptions': 4,
+    }
+
+    def prefetch_recipes(self, authors):
+        limit = get_recipes_limit(self.request)
+        recipes = Recipe.objects.filter(author__in=authors)
+        if limit is not None:
+            recipes = recipes.latest_per_author(limit)
+        prefetch_related_objects(authors, Prefetch(
+            'authored_recipes', queryset=recipes, to_attr='latest_recipes'
+        ))
+        return authors
+
+    def get_queryset(self):
+        return super().get_queryset().with_subscription(self.request.user)
 
     def get_serializer_class(self):
         if self.action == 'subscriptions':
@@ -60,14 +81,30 @@ class ModifiedUserViewSet(UserViewSet):
                          'author': author}
             )
             serializer.is_valid(raise_exception=True)
-            Subscribe.objects.create(user=user, author=author)
+            if author == user:
+                return Response('Нельзя подписаться на самого себя',
+                                status=status.HTTP_400_BAD_REQUEST)
+            if Subscribe.objects.insert_ignore(
+                user=user, author=author
+            ) is None:
+                return Response('Вы уже подписаны на этого автора',
+                                status=status.HTTP_400_BAD_REQUEST)
+            author = User.objects.with_subscription(
+                user
+            ).with_recipes_count().get(pk=author.pk)
+            serializer = SubscribeSerializer(
+                self.prefetch_recipes([author])[0],
+                context={'request': request}
+            )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
-            subscription = get_object_or_404(
-                Subscribe, user=user, author=author
-            )
-            subscription.delete()
+            deleted, _ = Subscribe.objects.filter(
+                user=user, author=author
+            ).delete()
+            if not deleted:
+                return Response('Вы не подписаны на этого автора',
+                                status=status.HTTP_404_NOT_FOUND)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -75,11 +112,21 @@ class ModifiedUserViewSet(UserViewSet):
         permission_classes=[IsAuthenticated]
     )
     def subscriptions(self, request):
-        queryset = User.objects.filter(author__user=request.user)
+        queryset = User.objects.filter(
+            author__user=request.user
+        ).with_subscription(
+            request.user
+        ).with_recipes_count().order_by('-id')
         pages = self.paginate_queryset(queryset)
-        serializer = SubscribeSerializer(pages,
-                                         many=True,
-                                         context={'request': request})
+        serializer = SubscribeSerializer(
+            self.prefetch_recipes(
+                list(queryset) if pages is None else pages
+            ),
+            many=True,
+            context={'request': request}
+        )
+        if pages is None:
+            return Response(serializer.data)
         return self.get_paginated_response(serializer.data)
 
     @action(